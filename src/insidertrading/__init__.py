@@ -1,3 +1,23 @@
 # SPDX-FileCopyrightText: 2024-present Don Caldwell <dfwcnj@gmail.com>
 #
 # SPDX-License-Identifier: MIT
+
+# the classes are imported on first use so importing the package is
+# cheap, e.g. from insidertrading import EDGARInsiderTrading
+_exports = {
+    'EDGARInsiderTrading': 'insidertrading.insidertrading',
+    'InsiderTradingError': 'insidertrading.insidertrading',
+    'InsiderDB': 'insidertrading.db',
+    'EDGARFetch': 'insidertrading.fetch',
+    'InsiderExport': 'insidertrading.export',
+    'Form345Table': 'insidertrading.table',
+    'StageStats': 'insidertrading.stages',
+}
+
+__all__ = list(_exports)
+
+def __getattr__(name):
+    if name in _exports:
+        import importlib
+        return getattr(importlib.import_module(_exports[name]), name)
+    raise AttributeError("module 'insidertrading' has no attribute %r" % (name) )
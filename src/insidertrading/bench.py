@@ -0,0 +1,297 @@
+#! env python
+
+import os
+import sys
+import json
+import random
+import zipfile
+import argparse
+
+try:
+    from insidertrading import insidertrading
+    from insidertrading import stages
+except ImportError as e:
+    import insidertrading  # type: ignore[no-redef]
+    import stages  # type: ignore[import-not-found, no-redef]
+
+class Form345Generator():
+
+    def __init__(self, seed=0):
+        """ Form345Generator
+
+        write synthetic form345 zip files shaped like the SEC insider
+        transactions data sets so the pipeline can be measured offline
+        seed - random seed so archives are reproducible
+        """
+        self.rnd = random.Random(seed)
+        # fraction of rows with a quote in a text field
+        self.quotes = 0.02
+        # fraction of trades without shares or price
+        self.noprice = 0.1
+        # fraction of dates written as DD-MM-YYYY instead of DD-MON-YYYY
+        self.numericdates = 0.0
+        # submissions per transaction and owners per submission
+        self.subsper = 0.4
+        self.ownersper = 1.1
+        self.year = 2025
+        self.quarter = 1
+
+        self.months = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN',
+                       'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+        self.transhdr = ['ACCESSION_NUMBER', 'NONDERIV_TRANS_SK',
+            'SECURITY_TITLE', 'SECURITY_TITLE_FN', 'TRANS_DATE',
+            'TRANS_DATE_FN', 'DEEMED_EXECUTION_DATE',
+            'DEEMED_EXECUTION_DATE_FN', 'TRANS_FORM_TYPE', 'TRANS_CODE',
+            'EQUITY_SWAP_INVOLVED', 'EQUITY_SWAP_TRANS_CD_FN',
+            'TRANS_TIMELINESS', 'TRANS_TIMELINESS_FN', 'TRANS_SHARES',
+            'TRANS_SHARES_FN', 'TRANS_PRICEPERSHARE',
+            'TRANS_PRICEPERSHARE_FN', 'TRANS_ACQUIRED_DISP_CD',
+            'TRANS_ACQUIRED_DISP_CD_FN', 'SHRS_OWND_FOLWNG_TRANS',
+            'SHRS_OWND_FOLWNG_TRANS_FN', 'VALU_OWND_FOLWNG_TRANS',
+            'VALU_OWND_FOLWNG_TRANS_FN', 'DIRECT_INDIRECT_OWNERSHIP',
+            'DIRECT_INDIRECT_OWNERSHIP_FN', 'NATURE_OF_OWNERSHIP',
+            'NATURE_OF_OWNERSHIP_FN']
+        self.subhdr = ['ACCESSION_NUMBER', 'FILING_DATE',
+            'PERIOD_OF_REPORT', 'DATE_OF_FILING_DATE_CHANGE',
+            'DOCUMENT_TYPE', 'ISSUERCIK', 'ISSUERNAME',
+            'ISSUERTRADINGSYMBOL', 'REMARKS', 'NO_SECURITIES_OWNED',
+            'NOT_SUBJECT_SEC16', 'FORM3_HOLDINGS_REPORTED',
+            'FORM4_TRANS_REPORTED', 'AFF10B5ONE']
+        self.ownerhdr = ['ACCESSION_NUMBER', 'RPTOWNERCIK',
+            'RPTOWNERNAME', 'RPTOWNER_RELATIONSHIP', 'RPTOWNER_TITLE',
+            'RPTOWNER_TXT', 'RPTOWNER_STREET1', 'RPTOWNER_STREET2',
+            'RPTOWNER_CITY', 'RPTOWNER_STATE', 'RPTOWNER_ZIPCODE',
+            'RPTOWNER_STATE_DESC', 'FILE_NUMBER']
+
+    def secdate(self):
+        """ secdate()
+
+        return a random date in the quarter in SEC form
+        """
+        day = self.rnd.randint(1, 28)
+        mon = 3 * (self.quarter - 1) + self.rnd.randint(1, 3)
+        if self.rnd.random() < self.numericdates:
+            return '%02d-%02d-%d' % (day, mon, self.year)
+        return '%02d-%s-%d' % (day, self.months[mon - 1], self.year)
+
+    def quoted(self, s):
+        """ quoted(s)
+
+        return s, sometimes with a quote character in it
+        """
+        if self.rnd.random() < self.quotes:
+            return "%s's" % (s)
+        return s
+
+    def accession(self, n):
+        return '%010d-%02d-%06d' % (1000000 + n % 9000000,
+                                    self.year % 100, n)
+
+    def transrows(self, nrows, nsubs):
+        """ transrows(nrows, nsubs)
+
+        generate NONDERIV_TRANS.tsv lines
+        nrows - number of transactions
+        nsubs - number of submissions they belong to
+        """
+        yield '\t'.join(self.transhdr)
+        rnd = self.rnd
+        for i in range(nrows):
+            shares = str(rnd.randint(1, 200000))
+            price = '%.4f' % (rnd.lognormvariate(3, 1.2))
+            if rnd.random() < self.noprice:
+                if rnd.random() < 0.5:
+                    price = ''
+                else:
+                    shares = ''
+            row = [self.accession(i % nsubs), str(i),
+                   self.quoted(rnd.choice(['Common Stock',
+                       'Class A Common Stock', 'Ordinary Shares'])), '',
+                   self.secdate(), '', '', '', '4',
+                   rnd.choice('PSAMFGJ'), '0', '',
+                   rnd.choice(['', '', '', 'L']), '',
+                   shares, '', price, '', rnd.choice('AD'), '',
+                   str(rnd.randint(0, 5000000)), '', '', '',
+                   rnd.choice('DDDI'), '',
+                   self.quoted(rnd.choice(['', '', 'By Trust'])), '']
+            yield '\t'.join(row)
+
+    def subrows(self, nsubs, nissuers):
+        """ subrows(nsubs, nissuers)
+
+        generate SUBMISSION.tsv lines
+        nsubs    - number of submissions
+        nissuers - number of distinct issuers
+        """
+        yield '\t'.join(self.subhdr)
+        rnd = self.rnd
+        for i in range(nsubs):
+            iss = i % nissuers
+            row = [self.accession(i), self.secdate(), self.secdate(), '',
+                   rnd.choice(['4', '4', '4', '4/A', '5']),
+                   str(1000000 + iss), self.quoted('Issuer %d Inc' % (iss)),
+                   'S%04d' % (iss), '', '0', '0', '', '', '']
+            yield '\t'.join(row)
+
+    def ownerrows(self, nsubs, nowners):
+        """ ownerrows(nsubs, nowners)
+
+        generate REPORTINGOWNER.tsv lines
+        nsubs   - number of submissions
+        nowners - number of distinct owners
+        """
+        yield '\t'.join(self.ownerhdr)
+        rnd = self.rnd
+        for i in range(nsubs):
+            n = 1
+            while rnd.random() < self.ownersper - n:
+                n = n + 1
+            for j in range(n):
+                own = rnd.randint(0, nowners - 1)
+                row = [self.accession(i), str(2000000 + own),
+                       self.quoted('Owner %d' % (own)),
+                       rnd.choice(['Director', 'Officer',
+                                   'Director,Officer', 'TenPercentOwner']),
+                       rnd.choice(['', 'CEO', 'CFO', 'General Counsel']),
+                       '', '1 Main St', '', 'Springfield', 'IL', '62701',
+                       '', '']
+                yield '\t'.join(row)
+
+    def writemember(self, zfp, name, lines):
+        """ writemember(zfp, name, lines)
+
+        stream lines into a zip member without holding them in memory
+        """
+        with zfp.open(name, mode='w', force_zip64=True) as bfp:
+            buf = []
+            for ln in lines:
+                buf.append(ln)
+                if len(buf) == 10000:
+                    bfp.write(('\n'.join(buf) + '\n').encode('utf-8') )
+                    buf = []
+            if buf:
+                bfp.write(('\n'.join(buf) + '\n').encode('utf-8') )
+
+    def makeform345zip(self, fzpath, nrows):
+        """ makeform345zip(fzpath, nrows)
+
+        write a synthetic form345 zip file
+        fzpath - file to write
+        nrows  - number of NONDERIV_TRANS rows
+        """
+        nsubs = max(1, int(nrows * self.subsper))
+        nissuers = max(1, nsubs // 20)
+        nowners = max(1, nsubs // 4)
+        with zipfile.ZipFile(fzpath, mode='w',
+                             compression=zipfile.ZIP_DEFLATED) as zfp:
+            self.writemember(zfp, 'SUBMISSION.tsv',
+                             self.subrows(nsubs, nissuers))
+            self.writemember(zfp, 'REPORTINGOWNER.tsv',
+                             self.ownerrows(nsubs, nowners))
+            self.writemember(zfp, 'NONDERIV_TRANS.tsv',
+                             self.transrows(nrows, nsubs))
+
+class Form345Bench():
+
+    def __init__(self, directory):
+        """ Form345Bench
+
+        time the form345 pipeline on synthetic archives
+        directory - where the synthetic archives are kept
+        """
+        self.directory = directory
+        self.results = []
+
+    def archive(self, nrows):
+        """ archive(nrows)
+
+        return the path of a synthetic archive with nrows
+        transactions, writing it if it does not exist
+        """
+        fzpath = os.path.join(self.directory, 'bench%d_form345.zip' % (nrows))
+        if not os.path.exists(fzpath):
+            print('writing %s' % (fzpath), file=sys.stderr)
+            Form345Generator().makeform345zip(fzpath, nrows)
+        return fzpath
+
+    def run(self, nrows, tracemalloc=False):
+        """ run(nrows, tracemalloc)
+
+        run every benchmark on one archive
+        nrows       - number of NONDERIV_TRANS rows
+        tracemalloc - measure the python heap peak, slows the runs
+        """
+        fzpath = self.archive(nrows)
+        stats = stages.StageStats()
+        stats.enable(tracemalloc=tracemalloc)
+        EIT = insidertrading.EDGARInsiderTrading()
+        EIT.stats = stats
+
+        with stats.stage('form345zipfilereader') as st:
+            n = 0
+            for la in EIT.form345zipfilereader(fzpath, 'NONDERIV_TRANS.tsv'):
+                n = n + 1
+            st['rowsin'] = n
+        # records the parse and load stages
+        EIT.parse345forms(fzpath)
+        EIT.processtransactions(':memory:')
+        with stats.stage('reporttable') as st:
+            with open(os.devnull, 'w') as fp:
+                st['rowsout'] = EIT.sdb.reporttable('insiders', fp)
+        for s in stats.stages:
+            s['nrows'] = nrows
+            rows = s['rowsin'] or s['rowsout']
+            s['rowspersec'] = None
+            if rows and s['wall'] > 0:
+                s['rowspersec'] = rows / s['wall']
+            self.results.append(s)
+        if tracemalloc:
+            import tracemalloc as tm
+            tm.stop()
+
+    def report(self, fp, fmt='table'):
+        """ report(fp, fmt)
+
+        write the results
+        fp  - file to write
+        fmt - table or json
+        """
+        if fmt == 'json':
+            for s in self.results:
+                print(json.dumps(s), file=fp)
+            return
+        fmts = '%10s %-28s %9s %10s %12s %12s %12s'
+        print(fmts % ('nrows', 'bench', 'seconds', 'rows', 'rows/sec',
+                      'peakrss', 'heappeak'), file=fp)
+        for s in self.results:
+            rows = s['rowsin'] or s['rowsout']
+            rps = '-'
+            if s['rowspersec']:
+                rps = '%.0f' % (s['rowspersec'])
+            print(fmts % (s['nrows'], s['stage'], '%.3f' % (s['wall']),
+                          rows, rps, s['peakrss'], s.get('heappeak', '-')),
+                  file=fp)
+
+def main():
+    argp = argparse.ArgumentParser(prog='insidertradingbench',
+              description='benchmark the form345 pipeline on synthetic archives')
+    argp.add_argument("--rows", default='10000,100000,1000000',
+        help="comma separated NONDERIV_TRANS row counts to run")
+    argp.add_argument("--directory", default='/tmp',
+        help="directory for the synthetic form345 zip files")
+    argp.add_argument("--tracemalloc", action='store_true', default=False,
+        help="measure the python heap peak of each benchmark")
+    argp.add_argument("--json", action='store_true', default=False,
+        help="write one json line per benchmark")
+    args = argp.parse_args()
+
+    B = Form345Bench(args.directory)
+    for nrows in [int(n) for n in args.rows.split(',')]:
+        B.run(nrows, args.tracemalloc)
+    fmt = 'table'
+    if args.json:
+        fmt = 'json'
+    B.report(sys.stdout, fmt)
+
+if __name__ == '__main__':
+    main()
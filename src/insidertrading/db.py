@@ -1,137 +1,734 @@
 
-import os
-import sys
+import csv
 import sqlite3
 import datetime
-import argparse
-import urllib.request
+import itertools
 
 class InsiderDB():
 
     def __init__(self):
         self.dbcon = None
+        # name of the connected database file
+        self.dbfile = None
         self.dbcur = None
         self.ttbl = "CREATE TABLE IF NOT EXISTS %s (%s)"
         self.tidx = "CREATE UNIQUE INDEX IF NOT EXISTS dtidx ON %s ('Date')"
         self.tins = 'INSERT OR IGNORE INTO %s VALUES (%s)'
-        self.tsel = "SELECT * FROM %s WHERE Date BETWEEN date('%s') AND date('%s')"
 
         # from transaction, submission owner  with dollars computed without footnotes
         #
-        self.itbl = "CREATE TABLE IF NOT EXISTS insiders ('ACCESSION_NUMBER', 'NONDERIV_TRANS_SK', 'SECURITY_TITLE', 'TRANS_DATE', 'DEEMED_EXECUTION_DATE', 'TRANS_FORM_TYPE', 'TRANS_CODE', 'EQUITY_SWAP_INVOLVED', 'TRANS_TIMELINESS', 'TRANS_SHARES', 'TRANS_PRICEPERSHARE', 'TRANS_ACQUIRED_DISP_CD', 'SHRS_OWND_FOLWNG_TRANS', 'VALU_OWND_FOLWNG_TRANS', 'DIRECT_INDIRECT_OWNERSHIP', 'NATURE_OF_OWNERSHIP', 'TRANSDOLLARS', 'FILING_DATE', 'NO_SECURITIES_OWNED', 'DOCUMENT_TYPE', 'ISSUERCIK', 'ISSUERNAME', 'ISSUERTRADINGSYMBOL', 'RPTOWNERCIK', 'RPTOWNERNAME', 'RPTOWNER_RELATIONSHIP', 'RPTOWNER_TITLE', 'RPTOWNER_TXT', 'FILE_NUMBER')"
+        self.icols = ['ACCESSION_NUMBER', 'NONDERIV_TRANS_SK',
+            'SECURITY_TITLE', 'TRANS_DATE', 'DEEMED_EXECUTION_DATE',
+            'TRANS_FORM_TYPE', 'TRANS_CODE', 'EQUITY_SWAP_INVOLVED',
+            'TRANS_TIMELINESS', 'TRANS_SHARES', 'TRANS_PRICEPERSHARE',
+            'TRANS_ACQUIRED_DISP_CD', 'SHRS_OWND_FOLWNG_TRANS',
+            'VALU_OWND_FOLWNG_TRANS', 'DIRECT_INDIRECT_OWNERSHIP',
+            'NATURE_OF_OWNERSHIP', 'TRANSDOLLARS', 'FILING_DATE',
+            'NO_SECURITIES_OWNED', 'DOCUMENT_TYPE', 'ISSUERCIK',
+            'ISSUERNAME', 'ISSUERTRADINGSYMBOL', 'RPTOWNERCIK',
+            'RPTOWNERNAME', 'RPTOWNER_RELATIONSHIP', 'RPTOWNER_TITLE',
+            'RPTOWNER_TXT', 'FILE_NUMBER']
 
-        self.iidx = "CREATE UNIQUE INDEX IF NOT EXISTS insidx ON insiders ('ACCESSION_NUMBER')"
-        self.ins = 'INSERT OR IGNORE INTO insiders VALUES (%s)'
+        # normalized schema, insiders is a view joining the tables
+        # bump schemaversion and extend migrate when it changes
+        self.schemaversion = 1
+        self.tcols = ['ACCESSION_NUMBER', 'NONDERIV_TRANS_SK',
+            'SECURITY_TITLE', 'TRANS_DATE', 'DEEMED_EXECUTION_DATE',
+            'TRANS_FORM_TYPE', 'TRANS_CODE', 'EQUITY_SWAP_INVOLVED',
+            'TRANS_TIMELINESS', 'TRANS_SHARES', 'TRANS_PRICEPERSHARE',
+            'TRANS_ACQUIRED_DISP_CD', 'SHRS_OWND_FOLWNG_TRANS',
+            'VALU_OWND_FOLWNG_TRANS', 'DIRECT_INDIRECT_OWNERSHIP',
+            'NATURE_OF_OWNERSHIP', 'TRANSDOLLARS']
+        self.scols = ['ACCESSION_NUMBER', 'FILING_DATE', 'PERIOD_OF_REPORT',
+            'DOCUMENT_TYPE', 'ISSUERCIK', 'ISSUERNAME',
+            'ISSUERTRADINGSYMBOL', 'NO_SECURITIES_OWNED']
+        self.ocols = ['ACCESSION_NUMBER', 'RPTOWNERCIK', 'RPTOWNERNAME',
+            'RPTOWNER_RELATIONSHIP', 'RPTOWNER_TITLE', 'RPTOWNER_TXT',
+            'FILE_NUMBER']
+        # column types, the rest are TEXT
+        # empty numbers are stored as NULL
+        self.ctypes = {'NONDERIV_TRANS_SK': 'INTEGER',
+            'TRANS_SHARES': 'REAL', 'TRANS_PRICEPERSHARE': 'REAL',
+            'SHRS_OWND_FOLWNG_TRANS': 'REAL',
+            'VALU_OWND_FOLWNG_TRANS': 'REAL', 'TRANSDOLLARS': 'REAL',
+            'ISSUERCIK': 'INTEGER', 'RPTOWNERCIK': 'INTEGER'}
+        self.tables = {
+            'transactions': (self.tcols, 'ACCESSION_NUMBER, NONDERIV_TRANS_SK'),
+            'submissions': (self.scols, 'ACCESSION_NUMBER'),
+            'owners': (self.ocols, 'ACCESSION_NUMBER, RPTOWNERCIK')}
+        self.indexes = {
+            'trdateidx': ('transactions', 'TRANS_DATE'),
+            'trdollaridx': ('transactions', 'TRANSDOLLARS'),
+            'subcikidx': ('submissions', 'ISSUERCIK'),
+            'subsymidx': ('submissions', 'ISSUERTRADINGSYMBOL'),
+            'subfdidx': ('submissions', 'FILING_DATE'),
+            'owncikidx': ('owners', 'RPTOWNERCIK')}
+        self.iview = 'CREATE VIEW IF NOT EXISTS insiders AS SELECT %s FROM transactions t JOIN submissions s ON s.ACCESSION_NUMBER = t.ACCESSION_NUMBER JOIN owners o ON o.ACCESSION_NUMBER = t.ACCESSION_NUMBER' % (
+            ', '.join([self.viewcol(c) for c in self.icols]) )
+        # dates are stored in the YYYY-MM-DD form of secdate2iso
+        self.isel = "SELECT %s FROM insiders WHERE %s BETWEEN ? AND ?"
 
+        # quarters already loaded into a persistent database
+        self.qtbl = "CREATE TABLE IF NOT EXISTS quarters ('QUARTER' PRIMARY KEY, 'FILE', 'ROWS', 'LOADED')"
+        self.qins = 'INSERT OR REPLACE INTO quarters VALUES (?,?,?,?)'
 
-    def query(self, url=None):
-        """query(url) - query a url
+        # form345 zip files and the filings loaded from them, see
+        # incremental loads
+        self.atbl = "CREATE TABLE IF NOT EXISTS archives ('ARCHIVE' PRIMARY KEY, 'SHA256', 'SIZE' INTEGER, 'MTIME' INTEGER, 'FILINGS' INTEGER, 'LOADED')"
+        self.ains = 'INSERT OR REPLACE INTO archives VALUES (?,?,?,?,?,?)'
+        self.ftbl = "CREATE TABLE IF NOT EXISTS filings ('ARCHIVE', 'ACCESSION_NUMBER', 'DIGEST', PRIMARY KEY (ARCHIVE, ACCESSION_NUMBER)) WITHOUT ROWID"
+        self.fins = 'INSERT OR REPLACE INTO filings VALUES (?,?,?)'
 
-         url - url of file to retrieve
-        """
-        try:
-            req = urllib.request.Request(url)
-            resp = urllib.request.urlopen(req)
-            return resp
-        except urllib.error.URLError as e:
-            print("Error %s(%s): %s" % ('query', url, e.reason),
-            file=sys.stderr )
-            sys.exit(1)
-
-    def selectndays(self, tblname, bdate, ndays):
-        """ selectndays(dbfile, tblname, bdate, ndays)
-
-        return ticker data for the ndays specified
-        tblname - name of table containing the ticker data
-        bdate - beginning date in iso format
-        ndays - number of days to collect
+        # per issuer statistics for the screens, kept up to date for the
+        # issuers each load touches
+        self.percentiles = [50, 75, 90, 95, 99]
+        self.stattables = {
+            'issuerstats': "CREATE TABLE IF NOT EXISTS issuerstats ('ISSUERCIK' INTEGER PRIMARY KEY, 'ISSUERNAME', 'ISSUERTRADINGSYMBOL', 'TRADES' INTEGER, 'DOLLARS' REAL, %s)" % (
+                ', '.join(["'P%d' REAL" % (p) for p in self.percentiles]) ),
+            'issuerdays': "CREATE TABLE IF NOT EXISTS issuerdays ('ISSUERCIK' INTEGER, 'TRANS_DATE', 'TRANS_CODE', 'RPTOWNERCIK' INTEGER, 'TRADES' INTEGER, 'DOLLARS' REAL, PRIMARY KEY (ISSUERCIK, TRANS_DATE, TRANS_CODE, RPTOWNERCIK)) WITHOUT ROWID"}
+
+        # rows per transaction for bulk loads
+        self.batchsize = 10000
+        # rows per fetchmany for reports
+        self.fetchsize = 10000
+
+    def selectndays(self, bdate, ndays, datecol='TRANS_DATE'):
+        """ selectndays(bdate, ndays, datecol)
+
+        return insiders rows with datecol in the ndays from bdate
+        bdate   - first date in iso format
+        ndays   - number of days to collect
+        datecol - TRANS_DATE or FILING_DATE
         """
         bd = datetime.date.fromisoformat(bdate)
-        td = datetime.timedelta(days=ndays+1)
-        ed = bd + td
-        bds = bd.strftime('%Y-%m-%d')
-        eds = ed.strftime('%Y-%m-%d')
-        dsql = self.tsel % (tblname, bds, eds)
-        res = self.dbcur.execute(dsql)
-        rowa = res.fetchall()
-        return rowa
-
-    def selectdays(self, tblname, sdate, edate):
-        """ selectndays(dbfile, tblname, sdate, edate)
-
-        return ticker data for the days specified
-        tblname - name of table containing the ticker data
-        sdate - beginning date in iso format
-        edate - end date in iso format
+        ed = bd + datetime.timedelta(days=ndays - 1)
+        return self.selectdays(bd.isoformat(), ed.isoformat(), datecol)
+
+    def selectdays(self, sdate, edate, datecol='TRANS_DATE'):
+        """ selectdays(sdate, edate, datecol)
+
+        return insiders rows with datecol between two dates
+        sdate   - first date in iso format
+        edate   - last date in iso format
+        datecol - TRANS_DATE or FILING_DATE
         """
         sd = datetime.date.fromisoformat(sdate)
         ed = datetime.date.fromisoformat(edate)
-        bds = sd.strftime('%Y-%m-%d')
-        eds = ed.strftime('%Y-%m-%d')
-        dsql = self.tsel % (tblname, bds, eds)
-        res = self.dbcur.execute(dsql)
-        rowa = res.fetchall()
-        return rowa
+        return self.insiderdays(sd.isoformat(), ed.isoformat(),
+                                datecol).fetchall()
+
+    def selectcols(self, table, cols=None):
+        """ selectcols(table, cols)
+
+        return the select list for columns of a table
+        table - name of the table
+        cols  - column names, None for all columns
+        """
+        if not cols:
+            return '*'
+        res = self.dbcur.execute('PRAGMA table_info(%s)' % (table) )
+        have = [row[1] for row in res.fetchall()]
+        for c in cols:
+            if c not in have:
+                raise ValueError('%s: no column %s' % (table, c) )
+        return ', '.join(["\"%s\"" % (c) for c in cols])
+
+    def insiderdays(self, sdate, edate, datecol='TRANS_DATE', order=None,
+                    limit=None, cols=None):
+        """ insiderdays(sdate, edate, datecol, order, limit, cols)
+
+        return a new cursor over the insiders with datecol in a window
+        sdate   - first date in YYYY-MM-DD form, None for no lower bound
+        edate   - last date in YYYY-MM-DD form, None for no upper bound
+        datecol - TRANS_DATE or FILING_DATE
+        order   - ORDER BY clause, e.g. TRANSDOLLARS DESC
+        limit   - maximum number of rows
+        cols    - columns to select, None for all columns
+        """
+        if datecol not in ['TRANS_DATE', 'FILING_DATE']:
+            raise ValueError('insiderdays: no index on %s' % (datecol) )
+        if not sdate:
+            sdate = '0'
+        if not edate:
+            edate = '9999-12-31'
+        isql = self.isel % (self.selectcols('insiders', cols), datecol)
+        if order:
+            isql = '%s ORDER BY %s' % (isql, order)
+        if limit:
+            isql = '%s LIMIT %d' % (isql, int(limit))
+        return self.dbcon.cursor().execute(isql, (sdate, edate) )
 
     def dbconnect(self, dbfile):
         """ dbconnect(dbfile)
 
-        establish connection to sqlite3 database
+        establish connection to sqlite3 database, a connection to the
+        same file is kept and one to another file is closed first
         dbfile - name of the database file
         """
+        if self.dbcon is not None:
+            if dbfile == self.dbfile:
+                return
+            self.dbcon.close()
         self.dbcon = sqlite3.connect(dbfile)
         self.dbcur = self.dbcon.cursor()
+        self.dbfile = dbfile
+
+    def setpragmas(self, journal_mode=None, synchronous=None,
+                   cache_size=None):
+        """ setpragmas(journal_mode, synchronous, cache_size)
+
+        set sqlite3 PRAGMAs that speed up a bulk load
+        journal_mode - e.g. MEMORY, WAL, DELETE
+        synchronous  - e.g. OFF, NORMAL, FULL
+        cache_size   - pages, or KiB if negative
+        """
+        if journal_mode:
+            self.dbcur.execute('PRAGMA journal_mode=%s' % (journal_mode) )
+        if synchronous:
+            self.dbcur.execute('PRAGMA synchronous=%s' % (synchronous) )
+        if cache_size:
+            self.dbcur.execute('PRAGMA cache_size=%d' % (int(cache_size)) )
+
+    def viewcol(self, col):
+        """ viewcol(col)
+
+        return the insiders view expression for a column
+        """
+        if col in self.tcols:
+            return 't.%s' % (col)
+        if col in self.scols:
+            return 's.%s' % (col)
+        return 'o.%s' % (col)
+
+    def tablesql(self, table):
+        """ tablesql(table)
+
+        return the CREATE TABLE statement for a normalized table
+        """
+        cols, pkey = self.tables[table]
+        cdefs = ['%s %s' % (c, self.ctypes.get(c, 'TEXT')) for c in cols]
+        return 'CREATE TABLE IF NOT EXISTS %s (%s, PRIMARY KEY (%s))' % (
+            table, ', '.join(cdefs), pkey)
+
+    def insertsql(self, table, cols):
+        """ insertsql(table, cols)
+
+        return the INSERT statement for rows of cols into a table
+        newer rows for the same key replace older ones
+        empty numeric values become NULL
+        table - name of the table
+        cols  - column names in row order
+        """
+        vals = []
+        for c in cols:
+            if c in self.ctypes:
+                vals.append("NULLIF(?, '')")
+            else:
+                vals.append('?')
+        return 'INSERT OR REPLACE INTO %s (%s) VALUES (%s)' % (
+            table, ', '.join(cols), ', '.join(vals) )
+
+    def userversion(self):
+        """ userversion()
+
+        return the user_version of the database
+        """
+        return self.dbcur.execute('PRAGMA user_version').fetchone()[0]
+
+    def migrate(self):
+        """ migrate()
+
+        bring a database to schemaversion
+        version 0 databases may hold the old denormalized insiders
+        table, its rows are moved into the normalized tables
+        """
+        version = self.userversion()
+        if version > self.schemaversion:
+            raise ValueError('insiderdb schema version %d is newer than %d' %
+                             (version, self.schemaversion) )
+        if version == self.schemaversion:
+            return
+        res = self.dbcur.execute("SELECT type FROM sqlite_master WHERE name='insiders'")
+        row = res.fetchone()
+        self.dbcur.execute('BEGIN')
+        try:
+            for table in self.tables:
+                self.dbcur.execute(self.tablesql(table) )
+            if row and row[0] == 'table':
+                self.dbcur.execute('ALTER TABLE insiders RENAME TO insiders0')
+                for table in self.tables:
+                    self.migraterows(table)
+                self.dbcur.execute('DROP TABLE insiders0')
+            self.dbcur.execute('PRAGMA user_version=%d' % (self.schemaversion) )
+        except Exception as e:
+            self.dbcon.rollback()
+            raise e
+        self.dbcon.commit()
+
+    def migraterows(self, table):
+        """ migraterows(table)
+
+        copy rows of the version 0 insiders table into a normalized
+        table with dates as YYYY-MM-DD. version 0 wrote the month
+        unpadded and the day padded, YYYYMDD for january to september
+        and YYYYMMDD after, anything else raises ValueError
+        table - name of the normalized table
+        """
+        cols = [c for c in self.tables[table][0] if c in self.icols]
+        dcols = [c for c in cols if 'DATE' in c or c == 'PERIOD_OF_REPORT']
+        sels = []
+        for c in cols:
+            if c in self.ctypes:
+                sels.append("NULLIF(%s, '')" % (c) )
+            elif c in dcols:
+                sels.append("CASE length(%s) WHEN 8 THEN substr(%s, 1, 4) || '-' || substr(%s, 5, 2) || '-' || substr(%s, 7, 2) WHEN 7 THEN substr(%s, 1, 4) || '-0' || substr(%s, 5, 1) || '-' || substr(%s, 6, 2) ELSE %s END" % (c, c, c, c, c, c, c, c) )
+            else:
+                sels.append(c)
+        self.dbcur.execute('INSERT OR IGNORE INTO %s (%s) SELECT %s FROM insiders0' % (
+                           table, ', '.join(cols), ', '.join(sels) ) )
+        for c in dcols:
+            res = self.dbcur.execute("SELECT COUNT(*), MIN(%s) FROM %s WHERE %s != '' AND %s NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'" % (c, table, c, c) )
+            nbad, bad = res.fetchone()
+            if nbad:
+                raise ValueError('insiderdb: %d %s values are not YYYY-MM-DD dates, e.g. %s, remove the database and load the quarters again' % (nbad, c, bad) )
+
+    def insertmany(self, table, cols, rows, batchsize=None):
+        """ insertmany(table, cols, rows, batchsize)
+
+        bulk load rows into a normalized table with one transaction
+        per batch
+        table     - transactions, submissions or owners
+        cols      - column names in row order
+        rows      - iterable of tuples of values in cols order
+        batchsize - rows per transaction, default self.batchsize
+        return number of rows offered
+        """
+        if not batchsize:
+            batchsize = self.batchsize
+        isql = self.insertsql(table, cols)
+        nrows = 0
+        rit = iter(rows)
+        while True:
+            batch = list(itertools.islice(rit, batchsize))
+            if len(batch) == 0:
+                break
+            if not self.dbcon.in_transaction:
+                self.dbcur.execute('BEGIN')
+            try:
+                self.dbcur.executemany(isql, batch)
+            except Exception as e:
+                self.dbcon.rollback()
+                raise e
+            self.dbcon.commit()
+            nrows = nrows + len(batch)
+        return nrows
+
+    def newinsidertable(self, index=True):
+        """ newinsidertable(index)
+
+        create or migrate the normalized tables and the insiders view
+        index - create the indexes now, otherwise call newinsiderindex
+                after the load
+        """
+        self.migrate()
+        self.dbcur.execute(self.iview)
+        if index:
+            self.newinsiderindex()
+        self.dbcon.commit()
+        self.newstattables()
+
+    def newinsiderindex(self):
+        """ newinsiderindex()
+
+        create the indexes after a bulk load
+        """
+        for idx in self.indexes:
+            table, col = self.indexes[idx]
+            self.dbcur.execute('CREATE INDEX IF NOT EXISTS %s ON %s (%s)' %
+                               (idx, table, col) )
+        self.dbcon.commit()
+
+    def newstattables(self):
+        """ newstattables()
+
+        create the screen statistics tables, computing them for every
+        issuer when they are added to a loaded database
+        """
+        res = self.dbcur.execute("SELECT name FROM sqlite_master WHERE name='issuerstats'")
+        new = res.fetchone() is None
+        for table in self.stattables:
+            self.dbcur.execute(self.stattables[table])
+        self.dbcon.commit()
+        if new:
+            res = self.dbcur.execute('SELECT 1 FROM transactions LIMIT 1')
+            if res.fetchone():
+                self.updatestats()
+
+    def filingissuers(self, accs):
+        """ filingissuers(accs)
+
+        return the set of ISSUERCIKs of filings in the database
+        accs - ACCESSION_NUMBERs
+        """
+        ciks = set()
+        for an in accs:
+            res = self.dbcur.execute('SELECT ISSUERCIK FROM submissions WHERE ACCESSION_NUMBER = ?', (an,) )
+            row = res.fetchone()
+            if row and row[0] is not None:
+                ciks.add(row[0])
+        return ciks
+
+    def updatestats(self, ciks=None):
+        """ updatestats(ciks)
+
+        recompute the issuerstats dollar percentiles and the issuerdays
+        trades per owner and day of issuers from the loaded trades
+        percentiles are nearest rank over trades with a dollar amount
+        ciks - ISSUERCIKs touched by a load, None for every issuer
+        """
+        sel, ssel = '1', '1'
+        if ciks is not None:
+            self.dbcur.execute('CREATE TEMP TABLE IF NOT EXISTS touched (ISSUERCIK INTEGER PRIMARY KEY)')
+            self.dbcur.execute('DELETE FROM temp.touched')
+            self.dbcur.executemany('INSERT OR IGNORE INTO temp.touched VALUES (?)',
+                                   [(int(c),) for c in ciks])
+            sel = 'ISSUERCIK IN (SELECT ISSUERCIK FROM temp.touched)'
+            ssel = 's.%s' % (sel)
+        pcts = ', '.join(['MIN(CASE WHEN RN >= %s * N THEN D END)' % (p / 100)
+                          for p in self.percentiles])
+        if not self.dbcon.in_transaction:
+            self.dbcur.execute('BEGIN')
+        try:
+            for table in self.stattables:
+                self.dbcur.execute('DELETE FROM %s WHERE %s' % (table, sel) )
+            self.dbcur.execute('INSERT INTO issuerstats SELECT ISSUERCIK, MAX(ISSUERNAME), MAX(ISSUERTRADINGSYMBOL), MAX(N), SUM(D), %s FROM (SELECT s.ISSUERCIK AS ISSUERCIK, s.ISSUERNAME AS ISSUERNAME, s.ISSUERTRADINGSYMBOL AS ISSUERTRADINGSYMBOL, t.TRANSDOLLARS AS D, ROW_NUMBER() OVER (PARTITION BY s.ISSUERCIK ORDER BY t.TRANSDOLLARS) AS RN, COUNT(*) OVER (PARTITION BY s.ISSUERCIK) AS N FROM transactions t JOIN submissions s ON s.ACCESSION_NUMBER = t.ACCESSION_NUMBER WHERE t.TRANSDOLLARS > 0 AND %s) GROUP BY ISSUERCIK' % (pcts, ssel) )
+            self.dbcur.execute("INSERT INTO issuerdays SELECT ISSUERCIK, TRANS_DATE, TRANS_CODE, RPTOWNERCIK, COUNT(*), SUM(TRANSDOLLARS) FROM insiders WHERE %s AND TRANS_DATE != '' AND TRANS_CODE IS NOT NULL AND RPTOWNERCIK IS NOT NULL GROUP BY ISSUERCIK, TRANS_DATE, TRANS_CODE, RPTOWNERCIK" % (sel) )
+        except Exception as e:
+            self.dbcon.rollback()
+            raise e
+        self.dbcon.commit()
+
+    def dollarscreen(self, percentile=99, mintrades=20, code=None,
+                     sdate=None, edate=None, limit=None, cols=None):
+        """ dollarscreen(percentile, mintrades, code, sdate, edate, limit,
+                         cols)
+
+        return a cursor over trades larger than a dollar percentile of
+        their issuer's trades, largest first
+        percentile - one of self.percentiles
+        mintrades  - only screen issuers with at least mintrades trades
+        code       - TRANS_CODE, None for every code
+        """
+        if percentile not in self.percentiles:
+            raise ValueError('dollarscreen: percentile not in %s' %
+                             (self.percentiles) )
+        where = ['TRANSDOLLARS > (SELECT st.P%d FROM issuerstats st WHERE st.ISSUERCIK = insiders.ISSUERCIK AND st.TRADES >= ?)' % (percentile)]
+        params = [int(mintrades)]
+        if code:
+            where.append('TRANS_CODE = ?')
+            params.append(code.upper())
+        return self.insiderquery(where, params, sdate, edate, limit=limit,
+                                 cols=cols)
+
+    def clusterscreen(self, days=5, owners=3, code=None, sdate=None,
+                      edate=None, limit=None):
+        """ clusterscreen(days, owners, code, sdate, edate, limit)
+
+        return a cursor over windows of days trade dates, starting on a
+        trade date in sdate to edate, in which at least owners distinct
+        insiders traded one issuer, most insiders first
+        days   - length of the window in days
+        owners - least number of distinct RPTOWNERCIKs
+        code   - TRANS_CODE, None for every code
+        """
+        cw, cp = '', []
+        if code:
+            cw, cp = 'AND TRANS_CODE = ?', [code.upper()]
+        qsql = "SELECT a.ISSUERCIK, st.ISSUERNAME, st.ISSUERTRADINGSYMBOL, a.TRANS_DATE AS SDATE, MAX(b.TRANS_DATE) AS EDATE, COUNT(DISTINCT b.RPTOWNERCIK) AS OWNERS, SUM(b.TRADES) AS TRADES, SUM(b.DOLLARS) AS DOLLARS FROM (SELECT DISTINCT ISSUERCIK, TRANS_DATE FROM issuerdays WHERE TRANS_DATE BETWEEN ? AND ? %s) a JOIN issuerdays b ON b.ISSUERCIK = a.ISSUERCIK AND b.TRANS_DATE BETWEEN a.TRANS_DATE AND date(a.TRANS_DATE, ?) %s LEFT JOIN issuerstats st ON st.ISSUERCIK = a.ISSUERCIK GROUP BY a.ISSUERCIK, a.TRANS_DATE HAVING OWNERS >= ? ORDER BY OWNERS DESC, DOLLARS DESC" % (
+            cw, cw.replace('TRANS_CODE', 'b.TRANS_CODE') )
+        params = [sdate or '0', edate or '9999-12-31'] + cp
+        params = params + ['+%d days' % (int(days) - 1)] + cp + [int(owners)]
+        if limit:
+            qsql = '%s LIMIT ?' % (qsql)
+            params.append(int(limit))
+        return self.dbcon.cursor().execute(qsql, params)
 
-    def insiderinsert(self, rec):
-        isql = self.ins % (rec)
-        self.dbcur.execute(isql)
+    def latescreen(self, days=4, sdate=None, edate=None, limit=None,
+                   cols=None):
+        """ latescreen(days, sdate, edate, limit, cols)
+
+        return a cursor over trades reported late, most days late first
+        a trade is late if TRANS_TIMELINESS is L or a form 4 was filed
+        more than days calendar days after the trade
+        days - calendar days allowed, 4 covers two business days over
+               a weekend
+        """
+        where = ["(TRANS_TIMELINESS = 'L' OR (DOCUMENT_TYPE IN ('4', '4/A') AND julianday(FILING_DATE) - julianday(TRANS_DATE) > ?))"]
+        return self.insiderquery(where, [int(days)], sdate, edate,
+                                 'julianday(FILING_DATE) - julianday(TRANS_DATE) DESC, TRANSDOLLARS DESC',
+                                 limit, cols)
+
+    def newquartertable(self):
+        self.dbcur.execute(self.qtbl)
         self.dbcon.commit()
 
-    def newtinsidertable(self):
-        self.dbcur.execute(self.titbl)
-        self.dbcur.execute(self.iidx)
+    def quarterinsert(self, yq, file, nrows):
+        """ quarterinsert(yq, file, nrows)
+
+        record that a quarter has been loaded
+        yq    - year quarter in form YYYYQ[1-4]
+        file  - name of the form345 zip file loaded
+        nrows - number of rows loaded
+        """
+        now = datetime.datetime.now().isoformat(timespec='seconds')
+        self.dbcur.execute(self.qins, (yq, file, nrows, now) )
         self.dbcon.commit()
 
-    def newinsidertable(self):
-        self.dbcur.execute(self.itbl)
-        self.dbcur.execute(self.iidx)
+    def quarters(self):
+        """ quarters()
+
+        return the set of quarters already loaded
+        """
+        res = self.dbcur.execute('SELECT QUARTER FROM quarters')
+        return set([row[0] for row in res.fetchall()])
+
+    def newarchivetable(self):
+        self.dbcur.execute(self.atbl)
+        self.dbcur.execute(self.ftbl)
         self.dbcon.commit()
 
-    def reporttable(self, table, fp):
-        rsql = 'SELECT * FROM %s' % (table)
-        self.dbcur.execute(rsql)
-        hdr = [column[0] for column in self.dbcur.description]
-        print('"%s"' % ('","'.join(hdr) ), file=fp )
-        rows = self.dbcur.fetchall()
-        for row in rows:
-            print('"%s"' % ('","'.join(row) ), file=fp )
-
-def main():
-    argp = argparse.ArgumentParser(description="Maintain an sqlite db of stock price history and insider trading")
-    argp.add_argument('--dbfile', default=':memory:',
-           help='sqlite3 database file to use ¯ default in memory')
-    argp.add_argument('--ticker', required=True,
-        help='ticker sybbol of stock history to collect')
-
-    args = argp.parse_args()
-
-    SDB = InsiderDB()
-
-    lines = SDB.gettickerhistory(args.ticker)
-    if not lines:
-        print('unable to get stock symbol history', file=sys.stderr)
-        sys.exit()
-    SDB.dbconnect(args.dbfile)
-    SDB.newtickertable(args.ticker, lines[0])
-    SDB.tickerinsertlines(args.ticker, lines)
-    now = datetime.datetime.now()
-    boy = datetime.date(now.year-1, 12, 12).isoformat()
-    tres = SDB.selectndays(args.ticker, boy, 7)
-    print(type(tres) )
-    for trec in tres:
-        print(type(trec) )
-        print(trec)
-
-
-if __name__ == '__main__':
-    main()
+    def archive(self, name):
+        """ archive(name)
+
+        return (SHA256, SIZE, MTIME) of the last load of a form345 zip
+        file or None if it has not been loaded
+        name - name of the form345 zip file
+        """
+        res = self.dbcur.execute('SELECT SHA256, SIZE, MTIME FROM archives WHERE ARCHIVE = ?', (name,) )
+        return res.fetchone()
+
+    def archiveinsert(self, name, sha256, size, mtime):
+        """ archiveinsert(name, sha256, size, mtime)
+
+        record the form345 zip file the filings table now reflects
+        name   - name of the form345 zip file
+        sha256 - hex sha256 of the file
+        size   - size of the file
+        mtime  - st_mtime_ns of the file
+        """
+        now = datetime.datetime.now().isoformat(timespec='seconds')
+        res = self.dbcur.execute('SELECT COUNT(*) FROM filings WHERE ARCHIVE = ?', (name,) )
+        nfilings = res.fetchone()[0]
+        self.dbcur.execute(self.ains, (name, sha256, size, mtime, nfilings,
+                                       now) )
+        self.dbcon.commit()
+
+    def archivefilings(self, name):
+        """ archivefilings(name)
+
+        return a dict of ACCESSION_NUMBER to digest of the filings
+        loaded from a form345 zip file
+        name - name of the form345 zip file
+        """
+        res = self.dbcur.execute('SELECT ACCESSION_NUMBER, DIGEST FROM filings WHERE ARCHIVE = ?', (name,) )
+        return dict(res.fetchall())
+
+    def deletefilings(self, accs):
+        """ deletefilings(accs)
+
+        delete the transactions, submissions and owners of filings
+        accs - ACCESSION_NUMBERs
+        """
+        accs = [(an,) for an in accs]
+        if len(accs) == 0:
+            return
+        if not self.dbcon.in_transaction:
+            self.dbcur.execute('BEGIN')
+        try:
+            for table in self.tables:
+                self.dbcur.executemany('DELETE FROM %s WHERE ACCESSION_NUMBER = ?' % (table), accs)
+        except Exception as e:
+            self.dbcon.rollback()
+            raise e
+        self.dbcon.commit()
+
+    def filingsupdate(self, name, digests, gone):
+        """ filingsupdate(name, digests, gone)
+
+        record the filings loaded from a form345 zip file
+        name    - name of the form345 zip file
+        digests - dict of ACCESSION_NUMBER to digest of loaded filings
+        gone    - ACCESSION_NUMBERs no longer in the file
+        """
+        if not self.dbcon.in_transaction:
+            self.dbcur.execute('BEGIN')
+        try:
+            self.dbcur.executemany('DELETE FROM filings WHERE ARCHIVE = ? AND ACCESSION_NUMBER = ?', [(name, an) for an in gone])
+            self.dbcur.executemany(self.fins, [(name, an, digests[an])
+                                               for an in digests])
+        except Exception as e:
+            self.dbcon.rollback()
+            raise e
+        self.dbcon.commit()
+
+    def insiderquery(self, where=(), params=(), sdate=None, edate=None,
+                     order='TRANSDOLLARS DESC', limit=None, cols=None):
+        """ insiderquery(where, params, sdate, edate, order, limit, cols)
+
+        return a new cursor over the insiders view
+        where  - conditions anded together, with ? for the params
+        params - values for the ? in where
+        sdate  - first TRANS_DATE in YYYY-MM-DD form, None for no bound
+        edate  - last TRANS_DATE in YYYY-MM-DD form, None for no bound
+        order  - ORDER BY clause
+        limit  - maximum number of rows
+        cols   - columns to select, None for all columns
+        """
+        where = list(where)
+        params = list(params)
+        if sdate or edate:
+            where.append('TRANS_DATE BETWEEN ? AND ?')
+            params.extend([sdate or '0', edate or '9999-12-31'])
+        qsql = 'SELECT %s FROM insiders' % (self.selectcols('insiders', cols))
+        if where:
+            qsql = '%s WHERE %s' % (qsql, ' AND '.join(where))
+        if order:
+            qsql = '%s ORDER BY %s' % (qsql, order)
+        if limit:
+            qsql = '%s LIMIT ?' % (qsql)
+            params.append(int(limit))
+        return self.dbcon.cursor().execute(qsql, params)
+
+    def topinsiders(self, sdate=None, edate=None, limit=20, cols=None):
+        """ topinsiders(sdate, edate, limit, cols)
+
+        return a cursor over the largest trades in a window
+        the view repeats a trade once per owner, limit counts trades
+        """
+        where, params = [], []
+        if limit:
+            tsql = 'SELECT t.ACCESSION_NUMBER, t.NONDERIV_TRANS_SK FROM transactions t WHERE EXISTS (SELECT 1 FROM submissions s WHERE s.ACCESSION_NUMBER = t.ACCESSION_NUMBER) AND EXISTS (SELECT 1 FROM owners o WHERE o.ACCESSION_NUMBER = t.ACCESSION_NUMBER)'
+            if sdate or edate:
+                tsql = '%s AND t.TRANS_DATE BETWEEN ? AND ?' % (tsql)
+                params.extend([sdate or '0', edate or '9999-12-31'])
+            tsql = '%s ORDER BY t.TRANSDOLLARS DESC LIMIT ?' % (tsql)
+            params.append(int(limit))
+            where.append('(ACCESSION_NUMBER, NONDERIV_TRANS_SK) IN (%s)' %
+                         (tsql) )
+        return self.insiderquery(where, params, sdate, edate, cols=cols)
+
+    def issuerinsiders(self, cik=None, symbol=None, sdate=None, edate=None,
+                       limit=None, cols=None):
+        """ issuerinsiders(cik, symbol, sdate, edate, limit, cols)
+
+        return a cursor over the trades in an issuer, largest first
+        cik    - ISSUERCIK
+        symbol - ISSUERTRADINGSYMBOL, used when cik is None
+        """
+        if cik is not None:
+            where, params = ['ISSUERCIK = ?'], [int(cik)]
+        elif symbol:
+            where, params = ['ISSUERTRADINGSYMBOL = ?'], [symbol.upper()]
+        else:
+            raise ValueError('issuerinsiders: cik or symbol required')
+        return self.insiderquery(where, params, sdate, edate, limit=limit,
+                                 cols=cols)
+
+    def ownerinsiders(self, cik, sdate=None, edate=None, limit=None,
+                      cols=None):
+        """ ownerinsiders(cik, sdate, edate, limit, cols)
+
+        return a cursor over the trades of a reporting owner, latest
+        first
+        cik - RPTOWNERCIK
+        """
+        return self.insiderquery(['RPTOWNERCIK = ?'], [int(cik)], sdate,
+                                 edate, 'TRANS_DATE DESC, TRANSDOLLARS DESC',
+                                 limit, cols)
+
+    def codeinsiders(self, code, sdate=None, edate=None, limit=None,
+                     cols=None):
+        """ codeinsiders(code, sdate, edate, limit, cols)
+
+        return a cursor over the trades with a transaction code,
+        largest first
+        code - TRANS_CODE, e.g. P for open market purchases
+        """
+        return self.insiderquery(['TRANS_CODE = ?'], [code.upper()], sdate,
+                                 edate, limit=limit, cols=cols)
+
+    def issuertotals(self, sdate=None, edate=None, limit=None):
+        """ issuertotals(sdate, edate, limit)
+
+        return a cursor over the trades, filings and dollars per issuer
+        in a window, most dollars first
+        """
+        qsql = 'SELECT s.ISSUERCIK, MAX(s.ISSUERNAME) AS ISSUERNAME, MAX(s.ISSUERTRADINGSYMBOL) AS ISSUERTRADINGSYMBOL, COUNT(*) AS TRADES, COUNT(DISTINCT t.ACCESSION_NUMBER) AS FILINGS, SUM(t.TRANSDOLLARS) AS DOLLARS, MAX(t.TRANSDOLLARS) AS LARGEST FROM transactions t JOIN submissions s ON s.ACCESSION_NUMBER = t.ACCESSION_NUMBER WHERE t.TRANS_DATE BETWEEN ? AND ? GROUP BY s.ISSUERCIK ORDER BY DOLLARS DESC'
+        params = [sdate or '0', edate or '9999-12-31']
+        if limit:
+            qsql = '%s LIMIT ?' % (qsql)
+            params.append(int(limit))
+        return self.dbcon.cursor().execute(qsql, params)
+
+    def daytotals(self, sdate=None, edate=None, limit=None):
+        """ daytotals(sdate, edate, limit)
+
+        return a cursor over the trades and dollars per trade date in a
+        window, in date order
+        """
+        qsql = 'SELECT TRANS_DATE, COUNT(*) AS TRADES, SUM(TRANSDOLLARS) AS DOLLARS, MAX(TRANSDOLLARS) AS LARGEST FROM transactions WHERE TRANS_DATE BETWEEN ? AND ? GROUP BY TRANS_DATE ORDER BY TRANS_DATE'
+        params = [sdate or '0', edate or '9999-12-31']
+        if limit:
+            qsql = '%s LIMIT ?' % (qsql)
+            params.append(int(limit))
+        return self.dbcon.cursor().execute(qsql, params)
+
+    def reportcursor(self, cur, fp):
+        """ reportcursor(cur, fp)
+
+        write the rows of a cursor as csv, fetchsize rows at a time
+        cur - executed cursor
+        fp  - file to write
+        return number of rows written
+        """
+        cw = csv.writer(fp, quoting=csv.QUOTE_ALL, lineterminator='\n')
+        cw.writerow([column[0] for column in cur.description])
+        nrows = 0
+        while True:
+            rows = cur.fetchmany(self.fetchsize)
+            if len(rows) == 0:
+                break
+            cw.writerows(rows)
+            nrows = nrows + len(rows)
+        cur.close()
+        return nrows
+
+    def reporttable(self, table, fp, order=None, limit=None, cols=None):
+        """ reporttable(table, fp, order, limit, cols)
+
+        write a table as csv without holding it in memory
+        table - name of the table
+        fp    - file to write
+        order - ORDER BY clause, e.g. TRANSDOLLARS DESC
+        limit - maximum number of rows
+        cols  - columns to write, None for all columns
+        return number of rows written
+        """
+        cur = self.tablecursor(table, order, limit, cols)
+        return self.reportcursor(cur, fp)
+
+    def tablecursor(self, table, order=None, limit=None, cols=None):
+        """ tablecursor(table, order, limit, cols)
+
+        return a new cursor over a table
+        table - name of the table
+        order - ORDER BY clause, e.g. TRANSDOLLARS DESC
+        limit - maximum number of rows
+        cols  - columns to select, None for all columns
+        """
+        rsql = 'SELECT %s FROM %s' % (self.selectcols(table, cols), table)
+        if order:
+            rsql = '%s ORDER BY %s' % (rsql, order)
+        if limit:
+            rsql = '%s LIMIT %d' % (rsql, int(limit))
+        return self.dbcon.cursor().execute(rsql)
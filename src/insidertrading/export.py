@@ -0,0 +1,193 @@
+
+import json
+import itertools
+import datetime
+
+class InsiderExport():
+
+    def __init__(self):
+        """ InsiderExport
+
+        write insiders query results as jsonl, parquet or arrow
+        rows are read from the cursor one row group at a time
+        parquet and arrow need the optional pyarrow package
+        pip install insidertrading[arrow]
+        """
+        self.rowgroup = 65536
+        self.numcols = ['TRANS_SHARES', 'TRANS_PRICEPERSHARE',
+                        'SHRS_OWND_FOLWNG_TRANS', 'VALU_OWND_FOLWNG_TRANS',
+                        'TRANSDOLLARS', 'DOLLARS', 'LARGEST']
+        self.intcols = ['NONDERIV_TRANS_SK', 'ISSUERCIK', 'RPTOWNERCIK',
+                        'TRADES', 'FILINGS', 'OWNERS']
+        self.datecols = ['TRANS_DATE', 'DEEMED_EXECUTION_DATE',
+                         'FILING_DATE', 'SDATE', 'EDATE']
+
+    def tonumber(self, v):
+        if v is None or v == '':
+            return None
+        return float(v)
+
+    def tointeger(self, v):
+        if v is None or v == '':
+            return None
+        return int(v)
+
+    def todate(self, v):
+        """ todate(v)
+
+        return a datetime.date for a YYYYMMDD or YYYY-MM-DD string
+        """
+        if v is None or v == '':
+            return None
+        v = v.replace('-', '')
+        return datetime.date(int(v[0:4]), int(v[4:6]), int(v[6:8]) )
+
+    def converters(self, cols):
+        """ converters(cols)
+
+        return a value converter, or None, for each column
+        cols - column names
+        """
+        cvs = []
+        for c in cols:
+            if c in self.numcols:
+                cvs.append(self.tonumber)
+            elif c in self.intcols:
+                cvs.append(self.tointeger)
+            elif c in self.datecols:
+                cvs.append(self.todate)
+            else:
+                cvs.append(None)
+        return cvs
+
+    def batches(self, cur):
+        """ batches(cur)
+
+        generate lists of converted rows from a cursor
+        cur - executed cursor
+        """
+        cols = [column[0] for column in cur.description]
+        cvs = self.converters(cols)
+        while True:
+            rows = cur.fetchmany(self.rowgroup)
+            if len(rows) == 0:
+                break
+            out = []
+            for row in rows:
+                out.append([v if cv is None else cv(v)
+                            for cv, v in zip(cvs, row)])
+            yield out
+        cur.close()
+
+    def exportjsonl(self, cur, fp):
+        """ exportjsonl(cur, fp)
+
+        write one json object per row
+        cur - executed cursor
+        fp  - text file to write
+        return number of rows written
+        """
+        cols = [column[0] for column in cur.description]
+        nrows = 0
+        for rows in self.batches(cur):
+            for row in rows:
+                rec = {}
+                for c, v in zip(cols, row):
+                    if isinstance(v, datetime.date):
+                        v = v.isoformat()
+                    rec[c] = v
+                print(json.dumps(rec), file=fp)
+            nrows = nrows + len(rows)
+        return nrows
+
+    def arrowtype(self, pa, vals):
+        """ arrowtype(pa, vals)
+
+        return the pyarrow type for values sqlite returned, int64 if
+        they are all integers, float64 if they are all numbers, else
+        string
+        vals - values of a column
+        """
+        vals = [v for v in vals if v is not None]
+        if vals and all([isinstance(v, int) for v in vals]):
+            return pa.int64()
+        if vals and all([isinstance(v, (int, float)) for v in vals]):
+            return pa.float64()
+        return pa.string()
+
+    def arrowschema(self, pa, cols, rows=()):
+        """ arrowschema(pa, cols, rows)
+
+        return the pyarrow schema for columns, the types of columns
+        not known here are taken from rows
+        rows - first batch of converted rows
+        """
+        fields = []
+        for i in range(len(cols)):
+            c = cols[i]
+            if c in self.numcols:
+                fields.append(pa.field(c, pa.float64()) )
+            elif c in self.intcols:
+                fields.append(pa.field(c, pa.int64()) )
+            elif c in self.datecols:
+                fields.append(pa.field(c, pa.date32()) )
+            else:
+                typ = self.arrowtype(pa, [row[i] for row in rows])
+                fields.append(pa.field(c, typ) )
+        return pa.schema(fields)
+
+    def exportarrow(self, cur, fp, fmt='parquet'):
+        """ exportarrow(cur, fp, fmt)
+
+        write rows as a parquet file or an arrow ipc file, one row
+        group or record batch per rowgroup rows
+        cur - executed cursor
+        fp  - binary file to write
+        fmt - parquet or arrow
+        return number of rows written
+        """
+        try:
+            import pyarrow as pa
+            if fmt == 'parquet':
+                import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError('%s output needs pyarrow: pip install insidertrading[arrow]' % (fmt) )
+        cols = [column[0] for column in cur.description]
+        batches = self.batches(cur)
+        first = next(batches, [])
+        schema = self.arrowschema(pa, cols, first)
+        if fmt == 'parquet':
+            wr = pq.ParquetWriter(fp, schema)
+        else:
+            wr = pa.ipc.new_file(fp, schema)
+        nrows = 0
+        try:
+            for rows in itertools.chain([first], batches):
+                if len(rows) == 0:
+                    continue
+                arrs = [pa.array([row[i] for row in rows], type=schema[i].type)
+                        for i in range(len(cols))]
+                batch = pa.RecordBatch.from_arrays(arrs, schema=schema)
+                if fmt == 'parquet':
+                    wr.write_table(pa.Table.from_batches([batch]) )
+                else:
+                    wr.write_batch(batch)
+                nrows = nrows + len(rows)
+        finally:
+            wr.close()
+        return nrows
+
+    def export(self, cur, fp, fmt):
+        """ export(cur, fp, fmt)
+
+        write rows in a format
+        cur - executed cursor
+        fp  - file to write, binary for parquet and arrow
+        fmt - jsonl, parquet or arrow
+        return number of rows written
+        """
+        if fmt == 'jsonl':
+            return self.exportjsonl(cur, fp)
+        if fmt in ['parquet', 'arrow']:
+            return self.exportarrow(cur, fp, fmt)
+        raise ValueError('export: unknown format %s' % (fmt) )
@@ -0,0 +1,316 @@
+
+import os
+import sys
+import time
+import random
+import asyncio
+import threading
+import http.client
+import urllib.parse
+import urllib.error
+import concurrent.futures
+
+class IncompleteBody(OSError):
+    """ the connection failed while a body was being stored, the file
+    holds what arrived """
+
+class TokenBucket():
+
+    def __init__(self, rate, capacity=None):
+        """ TokenBucket
+
+        limit requests to rate per second with bursts of up to
+        capacity requests, sec.gov asks for no more than 10 per second
+        rate     - tokens added per second
+        capacity - most tokens held, default rate
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    async def acquire(self):
+        """ acquire()
+
+        wait until a token is available and take it
+        """
+        while True:
+            self.refill()
+            if self.tokens >= 1.0:
+                self.tokens = self.tokens - 1.0
+                return
+            await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+class FetchResponse():
+
+    def __init__(self, url, status, headers, body=None, nbytes=0):
+        """ FetchResponse
+
+        status and headers of a completed request
+        url     - url requested
+        status  - HTTP status code
+        headers - http.client.HTTPMessage
+        body    - bytes read when the body was not stored in a file
+        nbytes  - bytes of the body read
+        """
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.nbytes = nbytes
+
+class EDGARFetch():
+
+    def __init__(self, hdr=None, ratelimit=10, connections=4):
+        """ EDGARFetch
+
+        asyncio HTTP client for sec.gov, requests run on a pool of
+        keep-alive connections in worker threads, are rate limited by a
+        token bucket and are retried with jittered backoff. failures
+        raise urllib.error.HTTPError or URLError
+        hdr         - request headers sent with every request, sec.gov
+                      wants a User-Agent identifying the caller
+        ratelimit   - requests per second
+        connections - most requests in flight
+        """
+        self.hdr = dict(hdr or {})
+        self.bucket = TokenBucket(ratelimit)
+        self.connections = connections
+        self.retries = 5
+        self.redirects = 5
+        self.pause = 2
+        self.timeout = 60
+        self.chunksize = 1048576
+        self.verbose = False
+        # idle keep-alive connections by (scheme, host, port)
+        self.idle = {}
+        self.plock = threading.Lock()
+        self.executor = None
+
+    def __getstate__(self):
+        st = self.__dict__.copy()
+        st['idle'] = {}
+        st['plock'] = None
+        st['executor'] = None
+        return st
+
+    def __setstate__(self, st):
+        self.__dict__.update(st)
+        self.plock = threading.Lock()
+
+    def pool(self):
+        """ pool()
+
+        return the worker threads that run the requests
+        """
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(
+                                max_workers=self.connections)
+        return self.executor
+
+    def connection(self, key):
+        """ connection(key)
+
+        return an idle connection to (scheme, host, port), or None
+        """
+        with self.plock:
+            conns = self.idle.get(key)
+            if conns:
+                return conns.pop()
+        return None
+
+    def newconnection(self, key):
+        """ newconnection(key)
+
+        return a new connection to (scheme, host, port)
+        """
+        scheme, host, port = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port,
+                                               timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def release(self, key, conn):
+        """ release(key, conn)
+
+        keep a connection whose response was read for the next request
+        """
+        with self.plock:
+            self.idle.setdefault(key, []).append(conn)
+
+    def close(self):
+        """ close()
+
+        close the idle connections and the worker threads
+        """
+        with self.plock:
+            for conns in self.idle.values():
+                for conn in conns:
+                    conn.close()
+            self.idle = {}
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def request(self, url, headers, file, append):
+        """ request(url, headers, file, append)
+
+        make one GET request on a pooled connection, runs in a worker
+        thread
+        url     - url to get
+        headers - request headers
+        file    - store a 200 or 206 body in file, None keeps it in
+                  the response
+        append  - add a 206 body to the end of file
+        return a FetchResponse
+        """
+        u = urllib.parse.urlsplit(url)
+        port = u.port or (443 if u.scheme == 'https' else 80)
+        key = (u.scheme, u.hostname, port)
+        path = u.path or '/'
+        if u.query:
+            path = '%s?%s' % (path, u.query)
+        conn = self.connection(key)
+        while True:
+            reused = conn is not None
+            if not reused:
+                conn = self.newconnection(key)
+            try:
+                conn.request('GET', path, headers=headers)
+                resp = conn.getresponse()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                conn = None
+                # the server may have closed an idle connection
+                if not reused:
+                    raise urllib.error.URLError(e)
+        if file and resp.status in (200, 206):
+            # errors from here on leave a partial file for the caller
+            mode = 'wb'
+            if append and resp.status == 206:
+                mode = 'ab'
+            nbytes = 0
+            try:
+                with open(file, mode) as fp:
+                    while True:
+                        buf = resp.read(self.chunksize)
+                        if not buf:
+                            break
+                        fp.write(buf)
+                        nbytes = nbytes + len(buf)
+                    fp.flush()
+                    os.fsync(fp.fileno() )
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                raise IncompleteBody('%s: %s' % (url, e) )
+            fr = FetchResponse(url, resp.status, resp.headers, None, nbytes)
+        else:
+            try:
+                body = resp.read()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                raise urllib.error.URLError(e)
+            fr = FetchResponse(url, resp.status, resp.headers, body,
+                               len(body))
+        if resp.will_close:
+            conn.close()
+        else:
+            self.release(key, conn)
+        return fr
+
+    def backoff(self, attempt, retryafter=None):
+        """ backoff(attempt, retryafter)
+
+        return seconds to wait before retry attempt, doubling from
+        self.pause with jitter so parallel retries spread out
+        retryafter - Retry-After header, seconds
+        """
+        if retryafter and retryafter.isdigit():
+            return float(retryafter)
+        return self.pause * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    async def get(self, url, headers=None, file=None, append=False):
+        """ get(url, headers, file, append)
+
+        get a url, following redirects and retrying connection
+        failures, 429 and 5xx responses
+        return a FetchResponse, 304 and 416 are returned rather than
+        raised
+        url     - url to get
+        headers - extra request headers
+        file    - store a 200 or 206 body in file, IncompleteBody is
+                  raised if the body is cut off
+        append  - add a 206 body to the end of file
+        """
+        hdrs = dict(self.hdr)
+        if headers:
+            hdrs.update(headers)
+        loop = asyncio.get_event_loop()
+        attempt = 0
+        nredirects = 0
+        while True:
+            await self.bucket.acquire()
+            if self.verbose:
+                print('get: %s' % (url), file=sys.stderr)
+            try:
+                fr = await loop.run_in_executor(self.pool(), self.request,
+                                                url, hdrs, file, append)
+            except urllib.error.URLError as e:
+                if attempt + 1 >= self.retries:
+                    raise e
+                wait = self.backoff(attempt)
+                print('%s: %s, retrying in %.1f seconds' % (url, e.reason, wait),
+                      file=sys.stderr)
+                await asyncio.sleep(wait)
+                attempt = attempt + 1
+                continue
+            if fr.status < 300 or fr.status in (304, 416):
+                return fr
+            err = urllib.error.HTTPError(url, fr.status,
+                                         http.client.responses.get(fr.status, ''),
+                                         fr.headers, None)
+            if fr.status in (301, 302, 303, 307, 308):
+                loc = fr.headers.get('Location')
+                if not loc or nredirects >= self.redirects:
+                    raise err
+                url = urllib.parse.urljoin(url, loc)
+                nredirects = nredirects + 1
+                continue
+            if fr.status != 429 and fr.status < 500:
+                raise err
+            if attempt + 1 >= self.retries:
+                raise err
+            wait = self.backoff(attempt, fr.headers.get('Retry-After'))
+            print('%s: %d, retrying in %.1f seconds' % (url, fr.status, wait),
+                  file=sys.stderr)
+            await asyncio.sleep(wait)
+            attempt = attempt + 1
+
+    async def gather(self, coros):
+        """ gather(coros)
+
+        run coroutines concurrently
+        return their results or exceptions in order
+        """
+        return await asyncio.gather(*coros, return_exceptions=True)
+
+    def run(self, coro):
+        """ run(coro)
+
+        run a coroutine to completion from synchronous code
+        """
+        return asyncio.run(coro)
+
+    def fetch(self, url, headers=None, file=None, append=False):
+        """ fetch(url, headers, file, append)
+
+        synchronous get
+        """
+        return self.run(self.get(url, headers, file, append) )
@@ -1,47 +1,74 @@
 #! env python
 
 import os
+import io
 import sys
 import re
+import csv
 import argparse
 import datetime
 import time
-import zipfile
-import urllib.request
-from html.parser import HTMLParser
-from functools import partial
-from xml.etree import ElementTree as ET
+import heapq
+import itertools
+import operator
+import json
+import importlib
 
 try:
-    from insidertrading import db
+    from insidertrading import table
+    from insidertrading import stages
 except ImportError as e:
-    import db
+    import table  # type: ignore[import-not-found, no-redef]
+    import stages  # type: ignore[import-not-found, no-redef]
+
+# zipfile, asyncio, html.parser, sqlite3 and the db, fetch and export
+# modules are imported by the methods that use them so a library user
+# only pays for what it calls
+
+def submodule(name):
+    """ submodule(name)
+
+    import an insidertrading module on first use
+    name - db, fetch or export
+    """
+    try:
+        return importlib.import_module('insidertrading.%s' % (name) )
+    except ImportError as e:
+        return importlib.import_module(name)
+
+class InsiderTradingError(Exception):
+    """ bad arguments or data, raised instead of exiting so the class
+    can be used as a library """
 
 class EDGARInsiderTrading():
-    def __init__(self):
+    def __init__(self, useragent=None):
         """ EDGARInsiderTrading
 
         attempt to connect EDGAR insider trading data with some data
         from other sources
+        construction has no side effects, the database, the HTTP client
+        and the EQEMAIL User-Agent are set up when first used
+        useragent - HTTP User-Agent for sec.gov, default EQEMAIL from the
+                    environment
         """
-        if 'EQEMAIL' in os.environ:
-            self.hdr     = {'User-Agent' : os.environ['EQEMAIL'] }
-        else:
-            print('EQEMAIL environmental variable must be set to a valid \
-                   HTTP User-Agent value such as an email address')
+        self.useragent = useragent
 
 
         self.pause = 2
         self.verbose = False
 
         self.mn = {
-            'JAN' : '1', 'FEB' : '2', 'MAR' : '3', 'APR' : '4',
-            'MAY' : '5', 'JUN' : '6', 'JUL' : '7', 'AUG' : '8',
-            'SEP' : '9', 'OCT' : '10', 'NOV' : '11', 'DEC' : '12'
+            'JAN' : '01', 'FEB' : '02', 'MAR' : '03', 'APR' : '04',
+            'MAY' : '05', 'JUN' : '06', 'JUL' : '07', 'AUG' : '08',
+            'SEP' : '09', 'OCT' : '10', 'NOV' : '11', 'DEC' : '12'
         }
-        # no longer used - all behind paywalls
-        self.threshold = None
-        self.interval = None
+        # window of trade dates to collect in YYYY-MM-DD form
+        self.sdate = None
+        self.edate = None
+        # issuer dollar percentile and cluster window in days for the
+        # screens, see setthreshold and setinterval
+        self.threshold = 99
+        self.interval = 5
 
         # from https://www.sec.gov/dera/data/form-345
         self.itdslurl = 'https://www.sec.gov/dera/data/form-345'
@@ -49,14 +76,103 @@ class EDGARInsiderTrading():
 
         self.iturl = 'https://www.sec.gov/files/structureddata/data/insider-transactions-data-sets'
 
-        self.submissions={}
-        self.transactions={}
-        self.owner={}
+        # Form345Tables of the parsed members
+        self.submissions = None
+        self.transactions = None
+        self.owner = None
+        # cache the parsed members next to the form345.zip file
+        self.cache = False
+        # change when the parsers produce different rows
+        self.parserversion = 3
+        # memo of secdate2iso conversions, cleared when it reaches
+        # isodatemax entries
+        self.isodates = {}
+        # DD-MON-YYYY or DD-MM-YYYY
+        self.secdatere = re.compile(r'(\d{1,2})-([A-Za-z]{3}|\d{1,2})-(\d{4})',
+                                    re.ASCII)
+        self.isodatemax = 65536
+        # columns whose few distinct values are shared between rows
+        self.tcats = ('SECURITY_TITLE', 'TRANS_DATE',
+            'DEEMED_EXECUTION_DATE', 'TRANS_FORM_TYPE', 'TRANS_CODE',
+            'EQUITY_SWAP_INVOLVED', 'TRANS_TIMELINESS',
+            'TRANS_ACQUIRED_DISP_CD', 'DIRECT_INDIRECT_OWNERSHIP',
+            'NATURE_OF_OWNERSHIP')
+        self.scats = ('FILING_DATE', 'PERIOD_OF_REPORT',
+            'DATE_OF_FILING_DATE_CHANGE', 'DOCUMENT_TYPE', 'ISSUERCIK',
+            'ISSUERNAME', 'ISSUERTRADINGSYMBOL', 'NO_SECURITIES_OWNED',
+            'NOT_SUBJECT_SEC16', 'FORM3_HOLDINGS_REPORTED',
+            'FORM4_TRANS_REPORTED', 'AFF10B5ONE')
+        self.ocats = ('RPTOWNERCIK', 'RPTOWNERNAME', 'RPTOWNER_RELATIONSHIP',
+            'RPTOWNER_TITLE', 'RPTOWNER_CITY', 'RPTOWNER_STATE',
+            'RPTOWNER_STATE_DESC')
+        # SUBMISSION and REPORTINGOWNER columns kept by the parsers
+        self.scols = ('ACCESSION_NUMBER', 'FILING_DATE', 'PERIOD_OF_REPORT',
+            'DOCUMENT_TYPE', 'ISSUERCIK', 'ISSUERNAME',
+            'ISSUERTRADINGSYMBOL', 'NO_SECURITIES_OWNED')
+        self.ocols = ('ACCESSION_NUMBER', 'RPTOWNERCIK', 'RPTOWNERNAME',
+            'RPTOWNER_RELATIONSHIP', 'RPTOWNER_TITLE', 'RPTOWNER_TXT',
+            'FILE_NUMBER')
 
         self.transtop=[]
-        self.sdb = db.InsiderDB()
-
-        self.chunksize =4294967296 # 4M
+        # InsiderDB, see sdb
+        self.idb = None
+
+        self.chunksize = 1048576 # 1M read buffer for downloads
+        # revalidate form345 zip files already downloaded
+        self.refresh = False
+        # load only new or changed filings into a persistent database
+        self.incremental = False
+        # trade sqlite3 durability for load speed
+        self.fastload = False
+        # keep only the top largest transactions, None keeps them all
+        self.top = None
+        # insiders columns to report, None reports them all
+        self.columns = None
+        # report format, csv jsonl parquet or arrow
+        self.format = 'csv'
+        # worker processes for parsing, 1 parses serially
+        self.jobs = 1
+        # smallest block of NONDERIV_TRANS.tsv handed to a process
+        self.blockmin = 1 << 20
+        # concurrent downloads and requests per second to sec.gov
+        self.dlworkers = 4
+        self.ratelimit = 10
+        # EDGARFetch shared by every request, see fetcher
+        self.fetch = None
+        # seconds before the discovery index is revalidated
+        self.indexttl = 86400
+        # per stage timings, see --profile
+        self.stats = stages.StageStats()
+        # data rows read by the last member parser
+        self.rowsin = 0
+
+    @property
+    def hdr(self):
+        """ request headers for sec.gov """
+        if not self.useragent:
+            self.useragent = os.environ.get('EQEMAIL')
+        if not self.useragent:
+            raise InsiderTradingError('EQEMAIL environmental variable must be set to a valid HTTP User-Agent value such as an email address')
+        return {'User-Agent' : self.useragent}
+
+    @property
+    def sdb(self):
+        """ the InsiderDB, created on first use """
+        if self.idb is None:
+            self.idb = submodule('db').InsiderDB()
+        return self.idb
+
+    def close(self):
+        """ close()
+
+        close the database and the connections to sec.gov
+        """
+        if self.idb is not None and self.idb.dbcon is not None:
+            self.idb.dbcon.close()
+        self.idb = None
+        if self.fetch is not None:
+            self.fetch.close()
+            self.fetch = None
 
     def setverbose(self):
         if self.verbose == False:
@@ -64,283 +180,802 @@ class EDGARInsiderTrading():
         else: self.verbose = False
 
     def setthreshold(self, thresh):
+        """ setthreshold(thresh)
+
+        set the issuer dollar percentile a trade must exceed to be
+        screened
+        thresh - one of 50, 75, 90, 95 or 99
+        """
         ti = int(thresh)
-        if ti < 0 or ti > 50:
-            print('setthreshold: range 0-50', file=sys.stderr)
-            sys.exit(1)
-        self.threshold = 1 + ti/100
+        if ti not in self.sdb.percentiles:
+            raise InsiderTradingError('setthreshold: one of %s' %
+                                      (self.sdb.percentiles) )
+        self.threshold = ti
 
     def setinterval(self, intvl):
+        """ setinterval(intvl)
+
+        set the window in days of the cluster screen
+        intvl - days, 1-14
+        """
         ti = int(intvl)
         if ti < 1 or ti > 14:
-            print('setinterval: range 1-14', file=sys.stderr)
-            sys.exit(1)
-        self.interval = intvl
+            raise InsiderTradingError('setinterval: range 1-14')
+        self.interval = ti
 
-    def query(self, url=None):
-        """query(url) - query a url
+    def setdates(self, sdate, edate):
+        """ setdates(sdate, edate)
 
-         url - url of file to retrieve
+        restrict the transactions collected to a window of trade dates
+        sdate - first day in iso format, None for no lower bound
+        edate - last day in iso format, None for no upper bound
         """
-        if self.verbose:
-            print('query: %s' % (url), file=sys.stderr)
-        count = 0
-        max   = 5
-        paws = self.pause
-        while True:
-            try:
-                req = urllib.request.Request(url, headers=self.hdr)
-                resp = urllib.request.urlopen(req)
-                return resp
-            except urllib.error.URLError as e:
-                if e.reason == 'Not Found':
-                    print('%s: %s' % (url, e.reason), file=sys.stderr)
-                    sys.exit(1)
-                print("Error %s(%s): %s" % ('query', url, e.reason),
-                     file=sys.stderr )
-                count = count + 1
-                if count < max:
-                    time.sleep(paws)
-                    print('pausing %d seconds' % (paws) )
-                    paws = paws * 2
-                    continue
-                sys.exit(1)
+        try:
+            if sdate:
+                self.sdate = datetime.date.fromisoformat(sdate).isoformat()
+            if edate:
+                self.edate = datetime.date.fromisoformat(edate).isoformat()
+        except ValueError as e:
+            raise InsiderTradingError('setdates: %s' % (e) )
 
-    def storequery(self, qresp, file):
-        """storequery(qresp, file)
+    def fetcher(self):
+        """ fetcher()
 
-        store the query response in a file
-        resp - response object of the url retrieved
-        file   - filename that will hold the query response
+        return the EDGARFetch that makes every request to sec.gov
         """
-        if self.verbose:
-            print('storequery: %s' % (file), file=sys.stderr)
-        if not qresp:
-            print('storequery: no content', file=sys.stderr)
-            sys.exit(1)
-        if not file:
-            print('storequery: no output filename', file=sys.stderr)
-            sys.exit(1)
-        of = os.path.abspath(file)
-        # some downloads can be somewhat large
-        with open(of, 'wb') as f:
-            parts = iter(partial(qresp.read, self.chunksize), b'')
-            for c in parts:
-                f.write(c)
-            #if c: f.write(c)
-            f.flush()
-            os.fsync(f.fileno() )
-            return
+        if self.fetch is None:
+            self.fetch = submodule('fetch').EDGARFetch(self.hdr,
+                                 self.ratelimit, self.dlworkers)
+            self.fetch.pause = self.pause
+            self.fetch.chunksize = self.chunksize
+            self.fetch.verbose = self.verbose
+        return self.fetch
+
+    def query(self, url=None, headers=None):
+        """query(url, headers) - query a url
+
+         url - url of file to retrieve
+         headers - extra request headers
+         return a fetch.FetchResponse with the body read
+         raise urllib.error.HTTPError or URLError on failure
+        """
+        return self.fetcher().fetch(url, headers)
 
     def secdate2iso(self, sd):
-        if '-' not in sd:
-            return sd
-        sda = sd.split('-')
-        if not sda[1].isnumeric():
-            sda[1] = self.mn[sda[1]]
-        sda = [sda[2],sda[1],sda[0]]
-        return ''.join(sda)
-
-    def form345zipfileiter(self, fzpath, file):
-        """ form345zipfileiter(fzpath, iter)
-
-        return an iterator for lines from file in fzpath
+        """ secdate2iso(sd)
+
+        return a DD-MON-YYYY or DD-MM-YYYY form345 date as YYYY-MM-DD
+        anything else, such as an empty or an already YYYY-MM-DD date,
+        is returned unchanged
+        a quarter has a few thousand distinct dates so conversions are
+        memoized
+        sd - date string, empty when the filer left it out
+        """
+        iso = self.isodates.get(sd)
+        if iso is not None:
+            return iso
+        m = self.secdatere.fullmatch(sd)
+        mon = None
+        if m:
+            mon = self.mn.get(m.group(2).upper(), m.group(2))
+        if mon is None or not mon.isdigit():
+            iso = sd
+        else:
+            iso = '%s-%s-%s' % (m.group(3), mon.zfill(2), m.group(1).zfill(2))
+        if len(self.isodates) >= self.isodatemax:
+            self.isodates.clear()
+        self.isodates[sd] = iso
+        return iso
+
+    def datecolumns(self, hdr, cols=None):
+        """ datecolumns(hdr, cols)
+
+        return the indexes of the date columns of a form345 header
+        so rows are converted without looking at every header name
+        hdr  - header row
+        cols - indexes to consider, None for all of them
+        """
+        if cols is None:
+            cols = range(len(hdr))
+        return [i for i in cols
+                if 'DATE' in hdr[i] or hdr[i] == 'PERIOD_OF_REPORT']
+
+    def rowdecoder(self, hdr, cols=None):
+        """ rowdecoder(hdr, cols)
+
+        inspect a form345 header once and return the kept column names
+        and a function turning a row into a list of their values with
+        the dates in YYYY-MM-DD form
+        hdr  - header row
+        cols - columns to keep, None for every column but the footnotes
+        """
+        if cols is None:
+            idx = [i for i in range(len(hdr)) if '_FN' not in hdr[i]]
+        else:
+            idx = [hdr.index(c) for c in cols if c in hdr]
+        names = [hdr[i] for i in idx]
+        # positions of the dates in the decoded row
+        dpos = self.datecolumns(names)
+        if len(idx) == 1:
+            get = lambda la: (la[idx[0]],)
+        else:
+            get = operator.itemgetter(*idx)
+        iso = self.secdate2iso
+        if not dpos:
+            return names, lambda la: list(get(la))
+        def decode(la):
+            row = list(get(la))
+            for j in dpos:
+                row[j] = iso(row[j])
+            return row
+        return names, decode
+
+    def form345zipfilereader(self, fzpath, file):
+        """ form345zipfilereader(fzpath, file)
+
+        return an iterator for tab separated rows from file in fzpath
+        each row is a list of fields
         fzpath - form345 zip file from fred.stlouisfed.org
         file  - file in the zip file to read
         """
+        import zipfile
         try:
-            lna = []
             with zipfile.ZipFile(fzpath, mode='r') as zfp:
-                fstr = zfp.read(file).decode("utf-8")
-                lge = (line for line in fstr.splitlines() )
-                return lge
-        except zipfile.BadZipfile as e:
-            print('open %s: %s', (fzpath, e) )
-            sys.exit(1)
+                with zfp.open(file, mode='r') as bfp:
+                    for la in self.tsvreader(bfp):
+                        yield la
+        except (zipfile.BadZipfile, KeyError) as e:
+            raise InsiderTradingError('open %s: %s' % (fzpath, e) )
+
+    def tsvreader(self, bfp):
+        """ tsvreader(bfp)
+
+        return an iterator for tab separated rows from a binary file
+        each row is a list of fields, blank lines are skipped
+        bfp - binary file holding utf-8 text
+        """
+        tfp = io.TextIOWrapper(bfp, encoding='utf-8', newline='')
+        rdr = csv.reader(tfp, delimiter='\t', quoting=csv.QUOTE_NONE)
+        for la in rdr:
+            if not la:      # blank line
+                continue
+            yield la
+
+    def form345blocks(self, fzpath, file, size):
+        """ form345blocks(fzpath, file, size)
+
+        generate (header, rowno, block) for a member of form345.zip so
+        worker processes can parse the blocks on their own
+        header is the first row, block about size bytes of whole lines
+        starting at data row rowno, a member without data rows gives
+        one empty block
+        fzpath - form345 zip file from fred.stlouisfed.org
+        file   - file in the zip file to read
+        size   - bytes per block
+        """
+        import zipfile
+        try:
+            with zipfile.ZipFile(fzpath, mode='r') as zfp:
+                with zfp.open(file, mode='r') as bfp:
+                    hdr = next(self.tsvreader(io.BytesIO(bfp.readline())),
+                               [])
+                    rowno = 0
+                    while True:
+                        blk = bfp.read(size)
+                        if not blk and rowno == 0:
+                            yield hdr, rowno, blk
+                        if not blk:
+                            break
+                        # no field holds a newline, QUOTE_NONE
+                        if not blk.endswith(b'\n'):
+                            blk = blk + bfp.readline()
+                        yield hdr, rowno, blk
+                        rowno = rowno + blk.count(b'\n')
+        except (zipfile.BadZipfile, KeyError) as e:
+            raise InsiderTradingError('open %s: %s' % (fzpath, e) )
 
     def form345transactions(self, fzpath, file):
         """ form345transactions(fzpath, file)
 
         collect form345 data from file in fzpath
+        return a Form345Table of the transactions with a TRANSDOLLARS
+        column, largest first when only the top are kept
         fzpath - form345 zip file from fred.stlouisfed.org
         file  - file in the zip file to read
         """
         if self.verbose:
             fznm = os.path.basename(fzpath)
             print('getting trades from %s in %s' % (file, fznm), file=sys.stderr)
-        lge = self.form345zipfileiter(fzpath, file)
-        # dictionary of nonderivative transactions with dollar amount key
-        prtransactions = {}
+        return self.transactionrows(self.form345zipfilereader(fzpath, file))
+
+    def transactionrows(self, lge, hdr=None, rowno=0):
+        """ transactionrows(lge, hdr, rowno)
+
+        collect the transactions from NONDERIV_TRANS.tsv rows
+        return a Form345Table of the transactions with a TRANSDOLLARS
+        column, largest first when only the top are kept
+        lge   - iterator over the rows
+        hdr   - header row, None when it is the first row of lge
+        rowno - data row number of the first row, for a block
+        """
+        if hdr is not None:
+            lge = itertools.chain([hdr], lge)
+        prtransactions = None
+        # min heap of the largest trades when only the top are wanted
+        heap = []
         hdr=[]
         lna=[]
         trsidx = 0
         trpidx = 0
         trdidx = 0
-        for ln in lge:
-            la =  re.split('\t', ln)
-            # key on trade dollar amount
+        stidx = 0
+        decode = None
+        first = rowno
+        rowno = rowno - 1
+        for la in lge:
             if len(hdr) == 0:
                 hdr = la
                 for i in range(len(hdr) ):
                     if hdr[i] == 'TRANS_SHARES':        trsidx = i
                     if hdr[i] == 'TRANS_PRICEPERSHARE': trpidx = i
+                    if hdr[i] == 'TRANS_DATE':          trdidx = i
+                    if hdr[i] == 'SECURITY_TITLE':      stidx = i
+                # ignore footnotes
+                cols, decode = self.rowdecoder(hdr)
+                cols.append('TRANSDOLLARS')
+                prtransactions = table.Form345Table(cols, self.tcats,
+                                                    ('TRANSDOLLARS',) )
                 continue
+            rowno = rowno + 1
 
             if len(la) < len(hdr):
                 print('trade len %s %d %d' % (la[0], len(hdr), len(la)), file=sys.stderr)
                 continue
             if la[trsidx] == '' or la[trpidx] == '': continue
-
-            th = {}
-            for i in range(len(hdr) ):
-                if '_FN' in hdr[i]:       # ignore footnotes
-                    continue
-                if 'DATE' in hdr[i]:      # convert to ISO format
-                    la[i] = self.secdate2iso(la[i])
-                th[hdr[i]] = la[i]
-                if "'" in la[i]:
-                    th[hdr[i]] = la[i].replace("'", "''")
-
-
-            if not re.match('(Common|Shares|Stock*)*', th['SECURITY_TITLE']):
+            # drop trades outside the date window before building a row
+            if self.sdate or self.edate:
+                trd = self.secdate2iso(la[trdidx])
+                if trd == '': continue
+                if self.sdate and trd < self.sdate: continue
+                if self.edate and trd > self.edate: continue
+
+            if not re.match('(Common|Shares|Stock*)*', la[stidx]):
                 continue
 
             transdollars = float(la[trsidx]) * float(la[trpidx])
             if transdollars == 0.0: continue
 
-            if transdollars not in prtransactions.keys():
-                prtransactions[transdollars] = []
-            th['TRANSDOLLARS'] = transdollars
-            prtransactions[transdollars].append(th)
+            if self.top:
+                # rowno breaks ties so lists are never compared
+                if len(heap) < self.top:
+                    heapq.heappush(heap, (transdollars, rowno, la) )
+                elif transdollars > heap[0][0]:
+                    heapq.heapreplace(heap, (transdollars, rowno, la) )
+                continue
+
+            row = decode(la)
+            row.append(transdollars)
+            prtransactions.append(row)
+
+        for transdollars, r, la in sorted(heap, reverse=True):
+            row = decode(la)
+            row.append(transdollars)
+            prtransactions.append(row)
+        self.rowsin = rowno + 1 - first
         return prtransactions
 
+    def toptransactions(self, trds, n):
+        """ toptransactions(trds, n)
+
+        return a table of the n largest transactions, largest first
+        trds - Form345Table of transactions
+        n    - number of transactions to keep
+        """
+        td = trds.column('TRANSDOLLARS')
+        top = heapq.nlargest(n, range(len(td)), key=lambda r: td[r])
+        return trds.select(top)
 
-    def form345submissions(self, fzpath, file):
-        """ form345submissions(self, fzpath, file)
+    def form345submissions(self, fzpath, file, accs=None):
+        """ form345submissions(self, fzpath, file, accs)
 
         get submission associated with largest transactions
+        return a Form345Table of the submissions
         fzpath - form345 zipfile to search
         file  - name of file to search
-        lt    - list of largest transactions
+        accs  - only keep these ACCESSION_NUMBERs, None keeps them all
         """
         if self.verbose:
             fznm = os.path.basename(fzpath)
             print('getting submissions from %s in %s' % (file, fznm), file=sys.stderr)
         # find transaction associated with submission
-        lge = self.form345zipfileiter(fzpath, file)
+        lge = self.form345zipfilereader(fzpath, file)
         hdr = []
-        prsubmission={}
-        for ln in lge:
-            la = re.split('\t', ln)
+        decode = None
+        prsubmission = None
+        rowno = 0
+        for la in lge:
             if len(hdr) == 0:
                 hdr = la
+                cols, decode = self.rowdecoder(hdr, self.scols)
+                prsubmission = table.Form345Table(cols, self.scats)
                 continue
-            an = la[0]
-            subm={}
-            for i in range(len(hdr)):
-                if 'DATE' in hdr[i] or hdr[i] == 'PERIOD_OF_REPORT':
-                    la[i] = self.secdate2iso(la[i])
-                subm[hdr[i]]=la[i]
-                if "'" in la[i]:
-                    subm[hdr[i]] = la[i].replace("'", "''")
-            prsubmission[an]=subm
+            rowno = rowno + 1
+            if len(la) < len(hdr):
+                print('submission len %s %d %d' % (la[0], len(hdr), len(la)), file=sys.stderr)
+                continue
+            if accs is not None and la[0] not in accs:
+                continue
+            prsubmission.append(decode(la) )
+        self.rowsin = rowno
         return prsubmission
 
-    def form345owners(self, fzpath, file):
-        """ form345owners(fzpath, file)
+    def form345owners(self, fzpath, file, accs=None):
+        """ form345owners(fzpath, file, accs)
 
         match owner name and cik to a transaction
+        return a Form345Table of the reporting owners, a filing may
+        have several
         fzpath - full path name to the form345.zip file
         file   - name of the file holding tranaction name and cik
+        accs   - only keep these ACCESSION_NUMBERs, None keeps them all
         """
         if self.verbose:
             fznm = os.path.basename(fzpath)
             print('getting submission owners from %s in %s' % (file, fznm), file=sys.stderr)
-        lge = self.form345zipfileiter(fzpath, file)
-        prowner={}
+        lge = self.form345zipfilereader(fzpath, file)
+        prowner = None
         hdr = []
-        for ln in lge:
-            la = re.split('\t', ln)
+        decode = None
+        rowno = 0
+        for la in lge:
             if len(hdr) == 0:
                 hdr = la
+                cols, decode = self.rowdecoder(hdr, self.ocols)
+                prowner = table.Form345Table(cols, self.ocats)
+                continue
+            rowno = rowno + 1
+            if len(la) < len(hdr):
+                print('owner len %s %d %d' % (la[0], len(hdr), len(la)), file=sys.stderr)
                 continue
-            an = la[0]
-            ownr = {}
-            for i in range(len(la)):
-                if 'DATE' in hdr[i]:      # convert to ISO format
-                    la[i] = self.secdate2iso(la[i])
-                ownr[hdr[i]] = la[i]
-                if "'" in la[i]:
-                    ownr[hdr[i]] = la[i].replace("'", "''")
-            prowner[an]=ownr
+            if accs is not None and la[0] not in accs:
+                continue
+            prowner.append(decode(la) )
+        self.rowsin = rowno
         return prowner
 
-    def latestform345name(self, html):
-        """ latestform345name(html)
+    def form345links(self, html):
+        """ form345links(html)
 
-        tease out url to latest form345 zip file 
-        html - html fragment to parse
+        return every form345 zip file linked from the insider
+        transactions data sets page, in page order, as dicts with
+        name, yq, url and the size shown next to the link
+        html - html of the page
         """
+        from html.parser import HTMLParser
         if '<html' not in html:
             html = '<html>%s</html>' % (html)
 
         class MyHTMLParser(HTMLParser):
             def __init__(self):
                 super().__init__()
-                self.src = None
-                self.prev = None
-                self.furl = None
+                self.links = []
+                # the link whose table row is being read
+                self.cur = None
             def handle_starttag(self, tag, attrs):
-                if self.furl == None and tag == 'a' and self.prev == 'td':
-                    for tpl in attrs:
-                        if tpl[0] == 'href':
-                            self.furl = '%s/%s' % ('https://www.sec.gov', tpl[1])
-                self.prev = tag
+                if tag == 'tr':
+                    self.cur = None
+                if tag != 'a':
+                    return
+                for k, v in attrs:
+                    if k == 'href' and v and v.endswith('_form345.zip'):
+                        url = v
+                        if v.startswith('/'):
+                            url = 'https://www.sec.gov%s' % (v)
+                        name = v.split('/')[-1]
+                        yq = name.split('_')[0].upper()
+                        self.cur = {'name': name, 'yq': yq, 'url': url,
+                                    'size': None}
+                        self.links.append(self.cur)
             def handle_data(self, data):
-                    # print('\thtml data: %s' % (data) )
-                    self.src = data
+                if self.cur is None or self.cur['size']:
+                    return
+                m = re.search(r'([0-9.]+)\s*([KMG]B)', data)
+                if m:
+                    self.cur['size'] = '%s %s' % (m.group(1), m.group(2))
 
         parser = MyHTMLParser()
         parser.feed(html)
-        return parser.furl
+        return parser.links
 
-    def form345name(self, yq):
-        """ form345name()
+    def latestform345name(self, html):
+        """ latestform345name(html)
+
+        tease out url to latest form345 zip file
+        html - html fragment to parse
+        """
+        links = self.form345links(html)
+        if len(links) == 0:
+            return None
+        return max(links, key=lambda l: l['yq'])['url']
+
+    def indexpath(self, directory):
+        """ indexpath(directory)
+
+        return the name of the discovery index kept in directory
+        """
+        return os.path.join(directory, 'form345index.json')
+
+    def form345index(self, directory=None, fatal=True):
+        """ form345index(directory, fatal)
+
+        return the form345 zip files sec.gov offers as form345links
+        dicts. the list is kept in directory and is only revalidated,
+        with a conditional request, once it is older than self.indexttl
+        seconds. if sec.gov can not be reached a stale list is used
+        directory - directory for the index, None to always fetch
+        fatal     - raise if there is no list, otherwise return None
+        raise urllib.error.URLError if sec.gov can not be reached
+        """
+        import urllib.error
+        idx = None
+        ifn = None
+        if directory:
+            ifn = self.indexpath(directory)
+            if os.path.exists(ifn):
+                try:
+                    with open(ifn) as fp:
+                        idx = json.load(fp)
+                except (OSError, ValueError) as e:
+                    print('%s: %s' % (ifn, e), file=sys.stderr)
+        if idx and time.time() - idx['fetched'] < self.indexttl:
+            return idx['archives']
+        hdrs = {}
+        if idx:
+            if idx.get('etag'):
+                hdrs['If-None-Match'] = idx['etag']
+            if idx.get('last_modified'):
+                hdrs['If-Modified-Since'] = idx['last_modified']
+        try:
+            resp = self.query(self.itlurl, headers=hdrs)
+        except (urllib.error.URLError, InsiderTradingError) as e:
+            # unreachable, or no User-Agent to ask with
+            if idx is None and fatal:
+                raise e
+            if idx is None:
+                print('%s: %s' % (self.itlurl, e), file=sys.stderr)
+                return None
+            print('%s: %s, using the index from %s' % (self.itlurl, e,
+                  time.ctime(idx['fetched'])), file=sys.stderr)
+            return idx['archives']
+        if resp.status == 304:
+            if self.verbose:
+                print('form345 index not modified', file=sys.stderr)
+        else:
+            idx = {'etag': resp.headers.get('ETag'),
+                   'last_modified': resp.headers.get('Last-Modified'),
+                   'archives': self.form345links(resp.body.decode('utf-8'))}
+        idx['fetched'] = time.time()
+        if ifn:
+            tfn = '%s.tmp' % (ifn)
+            with open(tfn, 'w') as fp:
+                json.dump(idx, fp, indent=1)
+            os.replace(tfn, ifn)
+        return idx['archives']
+
+    def form345name(self, yq, directory=None):
+        """ form345name(yq, directory)
 
         construct the name of the most recent SEC EDGAR insider trading
         data. It consists of data from forms 2-5, hence the name
+        yq        - year quarter in form YYYYQ[1-4], None for the latest
+        directory - where the discovery index is kept
         """
         fznm = None
         if yq:
             try:
-                ys, qs = yq.split('Q')
+                ys, qs = yq.upper().split('Q')
                 year = int(ys)
                 qtr = int(qs)
+                if qtr not in range(1, 5):
+                    raise ValueError('quarter not in range 1-4')
                 fznm = '%dq%d_form345.zip' % (year, qtr)
-            except Exception as e:
-                print('yq %s: %s' % (yq, e) )
+            except ValueError as e:
+                raise InsiderTradingError('yq %s: %s' % (yq, e) )
         else:
-            resp = self.query(self.itlurl)
-            rstr = resp.read().decode('utf-8')
-            fzurl = self.latestform345name(rstr)
-            fznm = fzurl.split('/')[-1]
+            links = self.form345index(directory)
+            if len(links) == 0:
+                raise InsiderTradingError('no form345 zip files listed at %s'
+                                          % (self.itlurl) )
+            fznm = max(links, key=lambda l: l['yq'])['name']
+        return fznm
 
+    def checkzip(self, fzpath):
+        """ checkzip(fzpath)
 
-        return fznm
+        return True if fzpath is a complete zip file whose members
+        all pass their CRC check
+        fzpath - zip file to check
+        """
+        import zipfile
+        try:
+            with zipfile.ZipFile(fzpath, mode='r') as zfp:
+                return zfp.testzip() is None
+        except (zipfile.BadZipfile, OSError, EOFError):
+            return False
 
     def getform345(self, file, directory):
-        """ getform345(directory)
+        """ getform345(file, directory)
 
         get the most recent form345.zip file from stlouisfed.org
+        file      - name of the form345 zip file
+        directory - directory to store it in
+        raise urllib.error.URLError or zipfile.BadZipfile on failure
         """
+        # a downloaded file needs no client, or User-Agent
+        if os.path.exists(os.path.join(directory, file)) and not self.refresh:
+            return
+        self.fetcher().run(self.agetform345(file, directory) )
+
+    async def agetform345(self, file, directory):
+        """ agetform345(file, directory)
+
+        download a form345 zip file
+        the download goes to file.part and is resumed with a range
+        request if it was interrupted. it only replaces file once it
+        is a valid zip file. with self.refresh set an existing file is
+        revalidated with a conditional request
+        file      - name of the form345 zip file
+        directory - directory to store it in
+        raise URLError or BadZipfile on failure
+        """
+        import urllib.error
         if self.verbose:
             print('collecting %s' % (file), file=sys.stderr)
         ofn = os.path.join(directory, file)
-        if os.path.exists(ofn):
+        if os.path.exists(ofn) and not self.refresh:
             return
+        for attempt in range(5):
+            with self.stats.stage('download %s' % (file)) as st:
+                done = await self.agetform345part(file, ofn)
+                if os.path.exists(ofn):
+                    st['bytes'] = os.path.getsize(ofn)
+            if done:
+                return
+            if self.verbose:
+                print('resuming %s' % (file), file=sys.stderr)
+        raise urllib.error.URLError('%s: download did not complete' % (file))
+
+    def readmeta(self, mfn):
+        """ readmeta(mfn)
+
+        return the url and validators saved with a download, {} if none
+        mfn - name of the .meta file
+        """
+        if not os.path.exists(mfn):
+            return {}
+        try:
+            with open(mfn) as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return {}
+
+    async def agetform345part(self, file, ofn):
+        """ agetform345part(file, ofn)
+
+        make one request for form345 zip file, resuming ofn.part
+        the validators of ofn are kept in ofn.meta and those of the
+        part file in ofn.part.meta, ofn.meta only changes with ofn
+        return False if the response ended before the file was complete
+        file  - name of the form345 zip file
+        ofn   - full path of the form345 zip file
+        raise URLError or BadZipfile on failure
+        """
+        import asyncio
+        import zipfile
+        fetch = submodule('fetch')
+        pfn = '%s.part' % (ofn)
+        mfn = '%s.meta' % (ofn)
+        pmfn = '%s.meta' % (pfn)
+        pmeta = self.readmeta(pmfn)
+        hdrs = {}
+        have = 0
+        if os.path.exists(pfn) and (pmeta.get('etag') or
+                                    pmeta.get('last_modified')):
+            # resume, a changed archive comes back whole
+            have = os.path.getsize(pfn)
+            hdrs['Range'] = 'bytes=%d-' % (have)
+            hdrs['If-Range'] = pmeta.get('etag') or pmeta['last_modified']
+        elif os.path.exists(ofn):
+            # revalidate, 304 if unchanged
+            meta = self.readmeta(mfn)
+            if meta.get('etag'):
+                hdrs['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                hdrs['If-Modified-Since'] = meta['last_modified']
         url = '%s/%s' % (self.iturl, file)
-        resp = self.query(url)
-        self.storequery(resp, ofn)
+        try:
+            # without a Range a 200 body replaces the part file
+            resp = await self.fetcher().get(url, hdrs, pfn, append=True)
+        except fetch.IncompleteBody as e:
+            # the body was cut off, the part file is resumed
+            print('%s: %s' % (file, e), file=sys.stderr)
+            return False
+        loop = asyncio.get_event_loop()
+        if resp.status == 304:
+            if self.verbose:
+                print('%s not modified' % (file), file=sys.stderr)
+            return True
+        if resp.status == 416:
+            # the partial file is complete or stale
+            if await loop.run_in_executor(None, self.checkzip, pfn):
+                self.commitform345(pfn, ofn, pmeta)
+                return True
+            for fn in [pfn, pmfn]:
+                if os.path.exists(fn):
+                    os.remove(fn)
+            return False
+        if resp.status == 200 or not pmeta:
+            pmeta = {'url': url, 'etag': resp.headers.get('ETag'),
+                     'last_modified': resp.headers.get('Last-Modified')}
+            with open(pmfn, 'w') as fp:
+                json.dump(pmeta, fp)
+        if resp.headers.get('Content-Length'):
+            expect = int(resp.headers.get('Content-Length'))
+            if resp.status == 206:
+                expect = expect + have
+            if os.path.getsize(pfn) < expect:
+                return False
+        with self.stats.stage('unzip %s' % (file)) as st:
+            st['bytes'] = os.path.getsize(pfn)
+            ok = await loop.run_in_executor(None, self.checkzip, pfn)
+        if not ok:
+            os.remove(pfn)
+            os.remove(pmfn)
+            raise zipfile.BadZipfile('%s: corrupt download' % (url))
+        self.commitform345(pfn, ofn, pmeta)
+        return True
+
+    def commitform345(self, pfn, ofn, meta):
+        """ commitform345(pfn, ofn, meta)
+
+        replace a form345 zip file with its verified part file and only
+        then record the validators it was downloaded with
+        pfn  - full path of the part file
+        ofn  - full path of the form345 zip file
+        meta - url and validators of the part file
+        """
+        mfn = '%s.meta' % (ofn)
+        os.replace(pfn, ofn)
+        tfn = '%s.tmp' % (mfn)
+        with open(tfn, 'w') as fp:
+            json.dump(meta, fp)
+        os.replace(tfn, mfn)
+        pmfn = '%s.meta' % (pfn)
+        if os.path.exists(pmfn):
+            os.remove(pmfn)
+
+    def form345range(self, yqrange):
+        """ form345range(yqrange)
+
+        return the list of year quarters in a range
+        yqrange - range in form YYYYQ[1-4]:YYYYQ[1-4]
+        raise InsiderTradingError if the range is malformed or reversed
+        """
+        try:
+            syq, eyq = yqrange.split(':')
+            sy, sq = [int(x) for x in syq.upper().split('Q')]
+            ey, eq = [int(x) for x in eyq.upper().split('Q')]
+            if sq not in range(1, 5) or eq not in range(1, 5):
+                raise ValueError('quarter not in range 1-4')
+            if (sy, sq) > (ey, eq):
+                raise ValueError('%s is after %s' % (syq, eyq))
+        except ValueError as e:
+            raise InsiderTradingError('range %s: %s' % (yqrange, e) )
+        yqs = []
+        y, q = sy, sq
+        while (y, q) <= (ey, eq):
+            yqs.append('%dQ%d' % (y, q))
+            q = q + 1
+            if q > 4:
+                y, q = y + 1, 1
+        return yqs
+
+    def getform345s(self, files, directory):
+        """ getform345s(files, directory)
+
+        download form345 zip files concurrently with at most
+        self.dlworkers requests in flight
+        files     - names of the form345 zip files
+        directory - directory to store them in
+        return the names of the files that are available
+        """
+        import zipfile
+        import urllib.error
+        allfiles = files
+        have = []
+        if not self.refresh:
+            # downloaded files need no client, or User-Agent
+            have = [file for file in files
+                    if os.path.exists(os.path.join(directory, file))]
+            files = [file for file in files if file not in have]
+        if len(files) == 0:
+            return have
+        F = self.fetcher()
+        res = F.run(F.gather([self.agetform345(file, directory)
+                              for file in files]) )
+        for file, r in zip(files, res):
+            if isinstance(r, (urllib.error.URLError, zipfile.BadZipfile)):
+                print('unable to collect %s: %s' % (file, r), file=sys.stderr)
+            elif isinstance(r, BaseException):
+                raise r
+            else:
+                have.append(file)
+        return [file for file in allfiles if file in have]
+
+    def processrange(self, insiderdb, yqrange, directory):
+        """ processrange(insiderdb, yqrange, directory)
+
+        load every quarter in a range into insiderdb skipping quarters
+        that are already loaded, with self.incremental set every quarter
+        is checked for new filings
+        insiderdb - name of the insider database file
+        yqrange   - range in form YYYYQ[1-4]:YYYYQ[1-4]
+        directory - directory to store the form345 zip files
+        """
+        if insiderdb == ':memory:':
+            raise InsiderTradingError('range: --insiderdb must name a database file, an in memory database is lost on exit')
+        # a bad range must not leave an empty database behind
+        ryqs = self.form345range(yqrange)
+        self.sdb.dbconnect(insiderdb)
+        self.sdb.newquartertable()
+        done = self.sdb.quarters()
+        # incremental loads check every quarter for new filings
+        yqs = [yq for yq in ryqs if self.incremental or yq not in done]
+        links = self.form345index(directory, fatal=False)
+        if links is not None:
+            have = set([l['yq'] for l in links])
+            missing = [yq for yq in yqs if yq not in have]
+            if missing:
+                print('not published yet: %s' % (' '.join(missing)),
+                      file=sys.stderr)
+            yqs = [yq for yq in yqs if yq in have]
+        if self.verbose:
+            print('%d quarters to load' % (len(yqs)), file=sys.stderr)
+        fznms = {self.form345name(yq): yq for yq in yqs}
+        for fznm in self.getform345s(list(fznms.keys()), directory):
+            fzpath = os.path.join(directory, fznm)
+            if self.incremental:
+                nrows = self.processincremental(insiderdb, fzpath)
+                if nrows == 0 and fznms[fznm] in done:
+                    continue
+            else:
+                # the quarter is recorded as loaded so it is loaded whole
+                self.process345formsall(fzpath)
+                nrows = self.processtransactions(insiderdb)
+            self.sdb.quarterinsert(fznms[fznm], fznm, nrows)
+
+    def loadquarter(self, insiderdb, yq=None, directory='/tmp'):
+        """ loadquarter(insiderdb, yq, directory)
+
+        download a quarter if needed and load it into insiderdb, the
+        instance can load several quarters in turn
+        insiderdb - name of the insider database
+        yq        - year quarter in form YYYYQ[1-4], None for the latest
+        directory - directory to store the form345 zip file
+        return number of transaction rows loaded
+        """
+        fznm = self.form345name(yq, directory)
+        fzpath = os.path.join(directory, fznm)
+        self.getform345(fznm, directory)
+        if self.incremental:
+            return self.processincremental(insiderdb, fzpath)
+        if insiderdb == ':memory:':
+            self.process345forms(fzpath)
+        else:
+            # later queries see the whole quarter, the report applies
+            # the window and top
+            self.process345formsall(fzpath)
+        return self.processtransactions(insiderdb)
 
     def constructurlargs(self, args):
         """ constructurlargs(args)
@@ -353,60 +988,543 @@ class EDGARInsiderTrading():
         aa[0] = aa[0].replace('&', '?')
         return ''.join(aa)
 
+    def __getstate__(self):
+        # worker processes get the settings, not the database connection
+        # or the parsed data
+        st = self.__dict__.copy()
+        st['idb'] = None
+        st['fetch'] = None
+        del st['stats']
+        st['submissions'] = None
+        st['transactions'] = None
+        st['owner'] = None
+        return st
+
+    def __setstate__(self, st):
+        self.__dict__.update(st)
+        self.stats = stages.StageStats()
+
+    def form345job(self, fzpath, file, block=None):
+        """ form345job(fzpath, file, block)
+
+        parse one form345 member, or one block of NONDERIV_TRANS.tsv,
+        in a worker process
+        return (file, Form345Table, rows read)
+        fzpath - full path to the form345.zip file
+        file   - name of the member to parse
+        block  - (header, rowno, block) from form345blocks
+        """
+        if block is not None:
+            hdr, rowno, blk = block
+            tbl = self.transactionrows(self.tsvreader(io.BytesIO(blk)),
+                                       hdr, rowno)
+        elif file == 'SUBMISSION.tsv':
+            tbl = self.form345submissions(fzpath, file)
+        else:
+            tbl = self.form345owners(fzpath, file)
+        return (file, tbl, self.rowsin)
+
+    def process345formsparallel(self, fzpath):
+        """ process345formsparallel(fzpath)
+
+        process form345.zip file in a pool of self.jobs processes
+        this process decompresses NONDERIV_TRANS.tsv and hands blocks
+        of whole lines to the pool while SUBMISSION.tsv and
+        REPORTINGOWNER.tsv are parsed alongside, their rows are then
+        cut to the filings of the kept transactions
+        fzpath - full path to the form345.zip file
+        """
+        import collections
+        import concurrent.futures
+        file = 'NONDERIV_TRANS.tsv'
+        # a few blocks per process keeps them busy to the end
+        size = max(self.membersize(fzpath, file) // (self.jobs * 4),
+                   self.blockmin)
+        self.transactions = None
+        rowsin = 0
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.jobs) as ex:
+            mfuts = [ex.submit(self.form345job, fzpath, file)
+                     for file in ['SUBMISSION.tsv', 'REPORTINGOWNER.tsv']]
+            # blocks are merged in file order, at most 2 * jobs are
+            # waiting so the member is never all in memory
+            bfuts = collections.deque()
+            for block in itertools.chain(self.form345blocks(fzpath, file,
+                                                            size), [None]):
+                if block is not None:
+                    bfuts.append(ex.submit(self.form345job, fzpath, file,
+                                           block) )
+                while bfuts and (block is None or
+                                 len(bfuts) > 2 * self.jobs):
+                    file, tbl, nrows = bfuts.popleft().result()
+                    rowsin = rowsin + nrows
+                    if self.transactions is None:
+                        self.transactions = tbl
+                    else:
+                        self.transactions.extend(tbl)
+            # each block kept its own top
+            if self.top:
+                self.transactions = self.toptransactions(self.transactions,
+                                                         self.top)
+            accs = set(self.transactions.column('ACCESSION_NUMBER') )
+            for fut in mfuts:
+                file, tbl, nrows = fut.result()
+                rowsin = rowsin + nrows
+                an = tbl.column('ACCESSION_NUMBER')
+                tbl = tbl.select([r for r in range(len(an)) if an[r] in accs])
+                if file == 'SUBMISSION.tsv':
+                    self.submissions = tbl
+                else:
+                    self.owner = tbl
+        self.rowsin = rowsin
+
+    def cachepath(self, fzpath):
+        """ cachepath(fzpath)
+
+        return the name of the parse cache kept next to a form345.zip
+        the cache is json so a planted file can not run code
+        fzpath - full path to the form345.zip file
+        """
+        return '%s.cache.json' % (os.path.splitext(fzpath)[0])
+
+    def cachekey(self, fzpath):
+        """ cachekey(fzpath)
+
+        return what the parse cache of a form345.zip depends on
+        fzpath - full path to the form345.zip file
+        """
+        st = os.stat(fzpath)
+        return {'archive': os.path.basename(fzpath), 'size': st.st_size,
+                'mtime': st.st_mtime_ns, 'version': self.parserversion}
+
+    def loadcache(self, fzpath):
+        """ loadcache(fzpath)
+
+        return the cached (transactions, submissions, owner)
+        Form345Tables for a form345.zip or None if there is no valid
+        cache
+        fzpath - full path to the form345.zip file
+        """
+        cfn = self.cachepath(fzpath)
+        if not os.path.exists(cfn):
+            return None
+        try:
+            with open(cfn, encoding='utf-8') as fp:
+                # the key line is checked before the tables are read
+                if json.loads(fp.readline()) != self.cachekey(fzpath):
+                    if self.verbose:
+                        print('stale cache %s' % (cfn), file=sys.stderr)
+                    return None
+                tbls = tuple([table.fromstate(json.loads(fp.readline()))
+                              for i in range(3)])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # a damaged cache, or one of another layout, is rebuilt
+            print('loadcache %s: %s' % (cfn, e), file=sys.stderr)
+            return None
+        if self.verbose:
+            print('using cache %s' % (cfn), file=sys.stderr)
+        return tbls
+
+    def storecache(self, fzpath, tbls):
+        """ storecache(fzpath, tbls)
+
+        save the parsed members of a form345.zip
+        fzpath - full path to the form345.zip file
+        tbls   - (transactions, submissions, owner) Form345Tables
+        """
+        cfn = self.cachepath(fzpath)
+        tfn = '%s.tmp' % (cfn)
+        with open(tfn, 'w', encoding='utf-8') as fp:
+            print(json.dumps(self.cachekey(fzpath)), file=fp)
+            for tbl in tbls:
+                print(json.dumps(tbl.state()), file=fp)
+        os.replace(tfn, cfn)
+
+    def filtertransactions(self, tbl):
+        """ filtertransactions(tbl)
+
+        apply the setdates window and top to a transactions table
+        tbl - Form345Table of transactions with TRANSDOLLARS
+        """
+        if not (self.sdate or self.edate or self.top):
+            return tbl
+        trd = tbl.column('TRANS_DATE')
+        rs = range(len(tbl))
+        if self.sdate or self.edate:
+            sdate = self.sdate or '0'
+            edate = self.edate or '9999-12-31'
+            rs = [r for r in rs if trd[r] != '' and sdate <= trd[r] <= edate]
+        if self.top:
+            td = tbl.column('TRANSDOLLARS')
+            rs = heapq.nlargest(self.top, rs, key=lambda r: td[r])
+        return tbl.select(rs)
+
     def process345forms(self, fzpath):
         """ process345forms(fzpath)
 
         process form345.zip file for largest transactions
+        with self.cache set the parsed members are kept next to the zip
+        file and reused until the zip file or the parser changes
         fzpath - full path to the form345.zip file
         """
-        trds = self.form345transactions(fzpath, 'NONDERIV_TRANS.tsv')
+        if not self.cache:
+            self.parse345forms(fzpath)
+            return
+        with self.stats.stage('cache load') as st:
+            tbls = self.loadcache(fzpath)
+            if tbls is not None:
+                st['bytes'] = os.path.getsize(self.cachepath(fzpath))
+                st['rowsout'] = len(tbls[0])
+        if tbls is None:
+            # cache everything, the window and top are applied after
+            self.process345formsall(fzpath, self.parse345forms)
+            tbls = (self.transactions, self.submissions, self.owner)
+            self.storecache(fzpath, tbls)
+        trs, self.submissions, self.owner = tbls
+        self.transactions = self.filtertransactions(trs)
+
+    def process345formsall(self, fzpath, process=None):
+        """ process345formsall(fzpath, process)
+
+        process form345.zip file ignoring the setdates window and top,
+        for loads that outlive the report the report applies them
+        fzpath  - full path to the form345.zip file
+        process - method to process the file, default process345forms
+        """
+        if process is None:
+            process = self.process345forms
+        sdate, edate, top = self.sdate, self.edate, self.top
+        self.sdate, self.edate, self.top = None, None, None
+        try:
+            process(fzpath)
+        finally:
+            self.sdate, self.edate, self.top = sdate, edate, top
+
+    def parse345forms(self, fzpath):
+        """ parse345forms(fzpath)
+
+        parse the transactions, submissions and owners in form345.zip
+        fzpath - full path to the form345.zip file
+        """
+        if self.jobs > 1:
+            with self.stats.stage('parse %d jobs' % (self.jobs)) as st:
+                st['bytes'] = self.membersize(fzpath)
+                self.process345formsparallel(fzpath)
+                st['rowsin'] = self.rowsin
+                st['rowsout'] = len(self.transactions)
+            return
+        file = 'NONDERIV_TRANS.tsv'
+        with self.stats.stage('parse %s' % (file)) as st:
+            st['bytes'] = self.membersize(fzpath, file)
+            trds = self.form345transactions(fzpath, file)
+            st['rowsin'], st['rowsout'] = self.rowsin, len(trds)
         self.transactions=trds
-        subm = self.form345submissions(fzpath, 'SUBMISSION.tsv')
+        # only the submissions and owners of these transactions are kept
+        accs = set(trds.column('ACCESSION_NUMBER') )
+        file = 'SUBMISSION.tsv'
+        with self.stats.stage('parse %s' % (file)) as st:
+            st['bytes'] = self.membersize(fzpath, file)
+            subm = self.form345submissions(fzpath, file, accs)
+            st['rowsin'], st['rowsout'] = self.rowsin, len(subm)
         self.submissions = subm
-        ownr = self.form345owners(fzpath, 'REPORTINGOWNER.tsv')
+        file = 'REPORTINGOWNER.tsv'
+        with self.stats.stage('parse %s' % (file)) as st:
+            st['bytes'] = self.membersize(fzpath, file)
+            ownr = self.form345owners(fzpath, file, accs)
+            st['rowsin'], st['rowsout'] = self.rowsin, len(ownr)
         self.owner = ownr
 
-    def processtransactions(self, insiderdb, sdate, edate):
+    def membersize(self, fzpath, file=None):
+        """ membersize(fzpath, file)
+
+        return the uncompressed size of a member of form345.zip
+        fzpath - full path to the form345.zip file
+        file   - name of the member, None for all members
+        """
+        import zipfile
+        with zipfile.ZipFile(fzpath, mode='r') as zfp:
+            if file:
+                return zfp.getinfo(file).file_size
+            return sum([zi.file_size for zi in zfp.infolist()])
+
+    def processtransactions(self, insiderdb):
         """ processtransactions(insiderdb)
 
         process transactions
         insiderdb - name of the insider database
-        sdate     - first date
-        edate     - last date
+        return number of rows offered to the database
         """
         if self.verbose:
             print('checking history for big transactions', file=sys.stderr)
         self.sdb.dbconnect(insiderdb)
-        self.sdb.newinsidertable()
-        sdt = datetime.date.fromisoformat(sdate)
-        edt = datetime.date.fromisoformat(edate)
-
-        for amt in self.transactions.keys():
-           tna = self.transactions[amt]
-           for tn in tna:
-               sub = self.submissions[tn['ACCESSION_NUMBER']]
-               tn['FILING_DATE']         = sub['FILING_DATE']
-               tn['NO_SECURITIES_OWNED'] = sub['NO_SECURITIES_OWNED']
-               tn['DOCUMENT_TYPE']       = sub['DOCUMENT_TYPE']
-               tn['ISSUERCIK']           = sub['ISSUERCIK']
-               tn['ISSUERNAME']          = sub['ISSUERNAME']
-               tn['ISSUERTRADINGSYMBOL'] = sub['ISSUERTRADINGSYMBOL']
-
-               own = self.owner[tn['ACCESSION_NUMBER']]
-               tn['RPTOWNERCIK']          = own['RPTOWNERCIK']
-               tn['RPTOWNERNAME']         = own['RPTOWNERNAME']
-               tn['RPTOWNER_RELATIONSHIP'] = own['RPTOWNER_RELATIONSHIP']
-               tn['RPTOWNER_TITLE']        = own['RPTOWNER_TITLE']
-               tn['RPTOWNER_TXT']        = own['RPTOWNER_TXT']
-               tn['FILE_NUMBER']          = own['FILE_NUMBER']
-
-               # print(tn)
-               # print(tn.keys())
-               rec = "'%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s','%s'" % (tn['ACCESSION_NUMBER'],tn['NONDERIV_TRANS_SK'], tn['SECURITY_TITLE'], tn['TRANS_DATE'], tn['DEEMED_EXECUTION_DATE'], tn['TRANS_FORM_TYPE'], tn['TRANS_CODE'], tn['EQUITY_SWAP_INVOLVED'], tn['TRANS_TIMELINESS'], tn['TRANS_SHARES'], tn['TRANS_PRICEPERSHARE'], tn['TRANS_ACQUIRED_DISP_CD'], tn['SHRS_OWND_FOLWNG_TRANS'], tn['VALU_OWND_FOLWNG_TRANS'], tn['DIRECT_INDIRECT_OWNERSHIP'], tn['NATURE_OF_OWNERSHIP'], tn['TRANSDOLLARS'], tn['FILING_DATE'], tn['NO_SECURITIES_OWNED'], tn['DOCUMENT_TYPE'], tn['ISSUERCIK'], tn['ISSUERNAME'], tn['ISSUERTRADINGSYMBOL'], tn['RPTOWNERCIK'], tn['RPTOWNERNAME'], tn['RPTOWNER_RELATIONSHIP'], tn['RPTOWNER_TITLE'], tn['RPTOWNER_TXT'], tn['FILE_NUMBER'])
-               self.sdb.insiderinsert(rec)
+        if self.fastload:
+            self.sdb.setpragmas(journal_mode='MEMORY', synchronous='OFF',
+                                cache_size=-262144)
+        self.sdb.newinsidertable(index=False)
+
+        # the insiders view joins the tables, only the submissions and
+        # owners of the kept transactions are loaded
+        accs = set(self.transactions.column('ACCESSION_NUMBER') )
+        self.unmatched(accs)
+        with self.stats.stage('load') as st:
+            nrows = self.loadtable('transactions', self.sdb.tcols,
+                                   self.transactions)
+            self.loadtable('submissions', self.sdb.scols,
+                           self.submissions, accs)
+            self.loadtable('owners', self.sdb.ocols, self.owner, accs)
+            self.sdb.newinsiderindex()
+            st['rowsin'] = nrows
+        self.updatestats(insiderdb, accs)
+        return nrows
+
+    def archivedigest(self, fzpath):
+        """ archivedigest(fzpath)
+
+        return the hex sha256 of a form345.zip file
+        fzpath - full path to the form345.zip file
+        """
+        import hashlib
+        h = hashlib.sha256()
+        with open(fzpath, 'rb') as fp:
+            while True:
+                buf = fp.read(self.chunksize)
+                if not buf:
+                    break
+                h.update(buf)
+        return h.hexdigest()
+
+    def filingdigests(self):
+        """ filingdigests()
+
+        return a dict of ACCESSION_NUMBER to a digest of the parsed
+        transactions, submission and owners of each filing
+        """
+        import hashlib
+        hs = {}
+        for tbl in [self.transactions, self.submissions, self.owner]:
+            aidx = tbl.cidx['ACCESSION_NUMBER']
+            for row in tbl.rows():
+                h = hs.get(row[aidx])
+                if h is None:
+                    h = hs[row[aidx]] = hashlib.sha1()
+                h.update(repr(row).encode('utf-8') )
+        an = set(self.transactions.column('ACCESSION_NUMBER') )
+        return {a: hs[a].hexdigest() for a in an}
+
+    def processincremental(self, insiderdb, fzpath):
+        """ processincremental(insiderdb, fzpath)
+
+        bring insiderdb up to date with a form345.zip file loading only
+        filings that are new or changed since the file was last loaded
+        and deleting filings that were withdrawn. a file with the size
+        and mtime, or else the sha256, of the last load is not parsed
+        the whole file is loaded, the window and top are applied by the
+        report
+        insiderdb - name of the insider database
+        fzpath    - full path to the form345.zip file
+        return number of transaction rows loaded
+        """
+        self.sdb.dbconnect(insiderdb)
+        if self.fastload:
+            self.sdb.setpragmas(journal_mode='MEMORY', synchronous='OFF',
+                                cache_size=-262144)
+        self.sdb.newinsidertable(index=False)
+        self.sdb.newarchivetable()
+        name = os.path.basename(fzpath)
+        fst = os.stat(fzpath)
+        prev = self.sdb.archive(name)
+        if prev and prev[1] == fst.st_size and prev[2] == fst.st_mtime_ns:
+            if self.verbose:
+                print('%s unchanged' % (name), file=sys.stderr)
+            return 0
+        with self.stats.stage('sha256 %s' % (name)) as st:
+            st['bytes'] = fst.st_size
+            sha = self.archivedigest(fzpath)
+        if prev and prev[0] == sha:
+            if self.verbose:
+                print('%s unchanged' % (name), file=sys.stderr)
+            self.sdb.archiveinsert(name, sha, fst.st_size, fst.st_mtime_ns)
+            return 0
+
+        self.process345formsall(fzpath)
+        digests = self.filingdigests()
+        old = self.sdb.archivefilings(name)
+        accs = set([an for an in digests if old.get(an) != digests[an]])
+        gone = set(old).difference(digests)
+        changed = accs.intersection(old)
+        if self.verbose:
+            print('%s: %d new, %d changed, %d withdrawn filings' %
+                  (name, len(accs) - len(changed), len(changed), len(gone)),
+                  file=sys.stderr)
+        self.unmatched(accs)
+        ciks = self.sdb.filingissuers(changed.union(gone) )
+        with self.stats.stage('load') as st:
+            # changed filings are replaced whole
+            self.sdb.deletefilings(changed.union(gone) )
+            nrows = self.loadtable('transactions', self.sdb.tcols,
+                                   self.transactions, accs)
+            self.loadtable('submissions', self.sdb.scols,
+                           self.submissions, accs)
+            self.loadtable('owners', self.sdb.ocols, self.owner, accs)
+            self.sdb.newinsiderindex()
+            st['rowsin'] = nrows
+        self.updatestats(insiderdb, accs, ciks)
+        self.sdb.filingsupdate(name, {an: digests[an] for an in accs}, gone)
+        self.sdb.archiveinsert(name, sha, fst.st_size, fst.st_mtime_ns)
+        return nrows
+
+    def updatestats(self, insiderdb, accs, ciks=()):
+        """ updatestats(insiderdb, accs, ciks)
+
+        bring the screen statistics of the issuers of loaded filings up
+        to date, in memory databases have no use for them
+        insiderdb - name of the insider database
+        accs      - ACCESSION_NUMBERs loaded
+        ciks      - ISSUERCIKs of filings deleted
+        """
+        if insiderdb == ':memory:':
+            return
+        ciks = set(ciks)
+        san = self.submissions.column('ACCESSION_NUMBER')
+        scik = self.submissions.column('ISSUERCIK')
+        for r in range(len(san)):
+            if san[r] in accs and scik[r] != '':
+                ciks.add(int(scik[r]) )
+        with self.stats.stage('stats') as st:
+            st['rowsin'] = len(ciks)
+            self.sdb.updatestats(ciks)
+
+    def loadtable(self, table, cols, tbl, accs=None):
+        """ loadtable(table, cols, tbl, accs)
+
+        load the rows of a parsed member into a database table
+        table - name of the database table
+        cols  - database columns, taken from tbl by name
+        tbl   - Form345Table of the member
+        accs  - only load rows with these ACCESSION_NUMBERs, None for all
+        return number of rows offered
+        """
+        cols = [c for c in cols if c in tbl.cidx]
+        rows = zip(*[tbl.column(c) for c in cols])
+        if accs is not None:
+            aidx = cols.index('ACCESSION_NUMBER')
+            rows = (row for row in rows if row[aidx] in accs)
+        return self.sdb.insertmany(table, cols, rows)
+
+    def unmatched(self, accs):
+        """ unmatched(accs)
+
+        report transactions without a submission or an owner, the
+        insiders join leaves them out
+        accs - ACCESSION_NUMBERs of the transactions
+        return (without submission, without owner) filing counts
+        """
+        nosub = accs.difference(self.submissions.column('ACCESSION_NUMBER') )
+        noown = accs.difference(self.owner.column('ACCESSION_NUMBER') )
+        for an in sorted(nosub)[:10]:
+            print('transaction %s has no submission' % (an), file=sys.stderr)
+        for an in sorted(noown)[:10]:
+            print('transaction %s has no reporting owner' % (an), file=sys.stderr)
+        if len(nosub) > 10 or len(noown) > 10:
+            print('%d filings without a submission, %d without an owner' %
+                  (len(nosub), len(noown)), file=sys.stderr)
+        return len(nosub), len(noown)
 
     def reportinsiders(self, fp):
-        self.sdb.reporttable('insiders', fp)
+        """ reportinsiders(fp)
+
+        write the insiders in the setdates window in self.format
+        largest transactions first
+        fp - file to write, binary for parquet and arrow
+        """
+        with self.stats.stage('report') as st:
+            cur = self.sdb.topinsiders(self.sdate, self.edate, self.top,
+                                       self.columns)
+            st['rowsout'] = self.writecursor(cur, fp)
+
+    def writecursor(self, cur, fp):
+        """ writecursor(cur, fp)
+
+        write the rows of a cursor in self.format
+        cur - executed cursor
+        fp  - file to write, binary for parquet and arrow
+        return number of rows written
+        """
+        if self.format == 'csv':
+            return self.sdb.reportcursor(cur, fp)
+        return submodule('export').InsiderExport().export(cur, fp,
+                                                          self.format)
+
+    def queryinsiders(self, insiderdb, query, fp, cik=None, symbol=None,
+                      code=None, limit=None):
+        """ queryinsiders(insiderdb, query, fp, cik, symbol, code, limit)
+
+        answer a query from an existing insider database in the
+        setdates window without downloading or parsing anything
+        insiderdb - name of the insider database
+        query     - top, issuer, owner, code, issuers or days
+        fp        - file to write, binary for parquet and arrow
+        cik       - ISSUERCIK for issuer, RPTOWNERCIK for owner
+        symbol    - ISSUERTRADINGSYMBOL for issuer
+        code      - TRANS_CODE for code
+        limit     - maximum number of rows
+        """
+        if not os.path.exists(insiderdb):
+            raise InsiderTradingError('query: no insider database %s' %
+                                      (insiderdb) )
+        self.sdb.dbconnect(insiderdb)
+        self.sdb.newinsidertable()
+        sd, ed, cols = self.sdate, self.edate, self.columns
+        with self.stats.stage('query %s' % (query)) as st:
+            if query == 'top':
+                cur = self.sdb.topinsiders(sd, ed, limit, cols)
+            elif query == 'issuer':
+                cur = self.sdb.issuerinsiders(cik, symbol, sd, ed, limit, cols)
+            elif query == 'owner':
+                cur = self.sdb.ownerinsiders(cik, sd, ed, limit, cols)
+            elif query == 'code':
+                cur = self.sdb.codeinsiders(code, sd, ed, limit, cols)
+            elif query == 'issuers':
+                cur = self.sdb.issuertotals(sd, ed, limit)
+            elif query == 'days':
+                cur = self.sdb.daytotals(sd, ed, limit)
+            else:
+                raise ValueError('unknown query %s' % (query) )
+            st['rowsout'] = self.writecursor(cur, fp)
+
+    def screeninsiders(self, insiderdb, screen, fp, code=None, mintrades=20,
+                       owners=3, days=4, limit=None):
+        """ screeninsiders(insiderdb, screen, fp, code, mintrades, owners,
+                           days, limit)
+
+        run a screen over an existing insider database in the setdates
+        window
+        insiderdb - name of the insider database
+        screen    - dollars, clusters or late
+        fp        - file to write, binary for parquet and arrow
+        code      - TRANS_CODE for dollars and clusters
+        mintrades - least trades of an issuer for dollars
+        owners    - least distinct insiders in a cluster
+        days      - calendar days to file a form 4 for late
+        limit     - maximum number of rows
+        """
+        if not os.path.exists(insiderdb):
+            raise InsiderTradingError('screen: no insider database %s' %
+                                      (insiderdb) )
+        self.sdb.dbconnect(insiderdb)
+        self.sdb.newinsidertable()
+        sd, ed, cols = self.sdate, self.edate, self.columns
+        with self.stats.stage('screen %s' % (screen)) as st:
+            if screen == 'dollars':
+                cur = self.sdb.dollarscreen(self.threshold, mintrades, code,
+                                            sd, ed, limit, cols)
+            elif screen == 'clusters':
+                cur = self.sdb.clusterscreen(self.interval, owners, code, sd,
+                                             ed, limit)
+            elif screen == 'late':
+                cur = self.sdb.latescreen(days, sd, ed, limit, cols)
+            else:
+                raise ValueError('unknown screen %s' % (screen) )
+            st['rowsout'] = self.writecursor(cur, fp)
 
 
 def main():
@@ -416,6 +1534,8 @@ def main():
 
     argp.add_argument("--yq", # default='2025Q2',
         help="year quarter in form YYYYQ[1-4]")
+    argp.add_argument("--range",
+        help="year quarters in form YYYYQ[1-4]:YYYYQ[1-4] loaded into --insiderdb")
 
 
     # 2025/0511
@@ -432,26 +1552,176 @@ def main():
     argp.add_argument("--file",
         help="csv file to store the output - default stdout")
 
+    argp.add_argument("--top", type=int,
+        help="report only the TOP largest transactions")
+    argp.add_argument("--refresh", action='store_true', default=False,
+        help="check sec.gov for newer copies of downloaded form345 zip files")
+    argp.add_argument("--incremental", action='store_true', default=False,
+        help="load only new or changed filings into --insiderdb, unchanged form345 zip files are not parsed")
+    argp.add_argument("--cache", action='store_true', default=False,
+        help="keep parsed quarters next to the form345 zip files for reuse")
+    argp.add_argument("--jobs", type=int, default=1,
+        help="number of processes parsing the form345 files")
+    argp.add_argument("--fastload", action='store_true', default=False,
+        help="relax sqlite3 durability while loading the database")
+
+    argp.add_argument("--profile", choices=['table', 'json'],
+        help="report time, rows, bytes and memory for each stage on stderr")
+    argp.add_argument("--cprofile",
+        help="save cProfile statistics of the run to CPROFILE")
+    argp.add_argument("--tracemalloc", action='store_true', default=False,
+        help="add the python heap peak of each stage to --profile")
+
+    argp.add_argument("--format", default='csv',
+        choices=['csv', 'jsonl', 'parquet', 'arrow'],
+        help="output format - parquet and arrow need pyarrow")
+    argp.add_argument("--columns",
+        help="comma separated insiders columns to report - default all")
+
     argp.add_argument("--verbose", action='store_true', default=False,
         help="reveal some of the process")
 
-    args = argp.parse_args()
-
-    fznm = EIT.form345name(args.yq)
-    fzpath = os.path.join(args.directory, fznm)
-    EIT.getform345(fznm, args.directory)
+    # queries of an existing --insiderdb
+    # options also given before the subcommand are not defaulted here
+    # so they are not reset
+    qargp = argparse.ArgumentParser(add_help=False)
+    qargp.add_argument("--insiderdb", required=True,
+        help="full path to the sqlite3 database to query")
+    qargp.add_argument("--sdate", default=argparse.SUPPRESS,
+        help="first day of trades to query")
+    qargp.add_argument("--edate", default=argparse.SUPPRESS,
+        help="last day of trades to query")
+    qargp.add_argument("--limit", type=int,
+        help="report at most LIMIT rows")
+    qargp.add_argument("--format", default=argparse.SUPPRESS,
+        choices=['csv', 'jsonl', 'parquet', 'arrow'],
+        help="output format - parquet and arrow need pyarrow")
+    qargp.add_argument("--file", default=argparse.SUPPRESS,
+        help="file to store the output - default stdout")
+    cargp = argparse.ArgumentParser(add_help=False)
+    cargp.add_argument("--columns", default=argparse.SUPPRESS,
+        help="comma separated insiders columns to report - default all")
+
+    subp = argp.add_subparsers(dest='command')
+    queryp = subp.add_parser('query',
+        help="query an existing --insiderdb without downloading anything")
+    qsubp = queryp.add_subparsers(dest='query', required=True)
+    qp = qsubp.add_parser('top', parents=[qargp, cargp],
+        help="largest trades")
+    qp.set_defaults(limit=20)
+    qp = qsubp.add_parser('issuer', parents=[qargp, cargp],
+        help="trades in an issuer, largest first")
+    qg = qp.add_mutually_exclusive_group(required=True)
+    qg.add_argument("--cik", type=int, help="issuer cik")
+    qg.add_argument("--symbol", help="issuer trading symbol")
+    qp = qsubp.add_parser('owner', parents=[qargp, cargp],
+        help="trades of a reporting owner, latest first")
+    qp.add_argument("--cik", type=int, required=True,
+        help="reporting owner cik")
+    qp = qsubp.add_parser('code', parents=[qargp, cargp],
+        help="trades with a transaction code, largest first")
+    qp.add_argument("--code", required=True,
+        help="transaction code, e.g. P purchase, S sale")
+    qsubp.add_parser('issuers', parents=[qargp],
+        help="trades, filings and dollars per issuer")
+    qsubp.add_parser('days', parents=[qargp],
+        help="trades and dollars per trade date")
+
+    screenp = subp.add_parser('screen',
+        help="screen an existing --insiderdb for unusual trades")
+    ssubp = screenp.add_subparsers(dest='screen', required=True)
+    sp = ssubp.add_parser('dollars', parents=[qargp, cargp],
+        help="trades above a dollar percentile of their issuer's trades")
+    sp.add_argument("--percentile", type=int, default=99,
+        help="issuer dollar percentile, 50 75 90 95 or 99 - default 99")
+    sp.add_argument("--mintrades", type=int, default=20,
+        help="screen issuers with at least MINTRADES trades - default 20")
+    sp.add_argument("--code",
+        help="transaction code, e.g. P purchase, S sale")
+    sp = ssubp.add_parser('clusters', parents=[qargp],
+        help="several insiders trading one issuer within a few days")
+    sp.add_argument("--days", type=int, default=5,
+        help="window in days, 1-14 - default 5")
+    sp.add_argument("--owners", type=int, default=3,
+        help="least number of insiders in a window - default 3")
+    sp.add_argument("--code",
+        help="transaction code, e.g. P purchase, S sale")
+    sp = ssubp.add_parser('late', parents=[qargp, cargp],
+        help="trades reported late")
+    sp.add_argument("--days", type=int, default=4,
+        help="calendar days allowed to file a form 4 - default 4")
 
-    EIT.process345forms(fzpath)
-    EIT.processtransactions(args.insiderdb, args.sdate, args.edate)
+    args = argp.parse_args()
+    if args.verbose:
+        EIT.setverbose()
+    if args.profile or args.cprofile:
+        EIT.stats.enable(cprofile=args.cprofile is not None,
+                         tracemalloc=args.tracemalloc)
+    import zipfile
+    import urllib.error
+    try:
+        EIT.fastload = args.fastload
+        EIT.setdates(args.sdate, args.edate)
+        EIT.jobs = args.jobs
+        EIT.top = args.top
+        EIT.cache = args.cache
+        EIT.refresh = args.refresh
+        EIT.incremental = args.incremental
+        if args.columns:
+            EIT.columns = args.columns.split(',')
+        EIT.format = args.format
+
+        if args.command == 'screen':
+            if args.screen == 'dollars':
+                EIT.setthreshold(args.percentile)
+            elif args.screen == 'clusters':
+                EIT.setinterval(args.days)
+
+        if args.command in ['query', 'screen']:
+            pass
+        elif args.range:
+            EIT.processrange(args.insiderdb, args.range, args.directory)
+        else:
+            EIT.loadquarter(args.insiderdb, args.yq, args.directory)
+    except (InsiderTradingError, urllib.error.URLError,
+            zipfile.BadZipfile, ValueError) as e:
+        print('%s' % (e), file=sys.stderr)
+        sys.exit(1)
 
     fp = sys.stdout
+    mode = 'w'
+    if args.format in ['parquet', 'arrow']:
+        fp = sys.stdout.buffer
+        mode = 'wb'
     if args.file:
         try:
-            fp = open(args.file, 'w')
+            fp = open(args.file, mode)
         except Exception as e:
-            print('' % (), file=sys.stderr)
+            print('%s: %s' % (args.file, e), file=sys.stderr)
             sys.exit(1)
-    EIT.reportinsiders(fp)
+    try:
+        if args.command == 'query':
+            EIT.queryinsiders(args.insiderdb, args.query, fp,
+                              getattr(args, 'cik', None),
+                              getattr(args, 'symbol', None),
+                              getattr(args, 'code', None), args.limit)
+        elif args.command == 'screen':
+            EIT.screeninsiders(args.insiderdb, args.screen, fp,
+                               getattr(args, 'code', None),
+                               getattr(args, 'mintrades', 20),
+                               getattr(args, 'owners', 3),
+                               getattr(args, 'days', 4), args.limit)
+        else:
+            EIT.reportinsiders(fp)
+    except (ValueError, ImportError, InsiderTradingError) as e:
+        print('%s: %s' % (args.command or 'report', e), file=sys.stderr)
+        sys.exit(1)
+    EIT.close()
+
+    if args.profile:
+        EIT.stats.report(sys.stderr, args.profile)
+    if args.cprofile:
+        EIT.stats.dumpcprofile(args.cprofile)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,123 @@
+
+import sys
+import json
+import time
+import contextlib
+
+try:
+    import resource
+except ImportError as e:
+    resource = None  # type: ignore[assignment]
+
+class StageStats():
+
+    def __init__(self):
+        """ StageStats
+
+        record wall time, cpu time, rows in and out, bytes read and
+        peak memory for each stage of a run
+        """
+        self.enabled = False
+        self.stages = []
+        # optional cProfile.Profile and tracemalloc peaks
+        self.cprofile = None
+        self.tracemalloc = False
+
+    def enable(self, cprofile=False, tracemalloc=False):
+        """ enable(cprofile, tracemalloc)
+
+        start recording stages
+        cprofile    - also run the cProfile profiler
+        tracemalloc - also record the python heap peak of each stage
+        """
+        self.enabled = True
+        if cprofile:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        if tracemalloc:
+            import tracemalloc as tm
+            tm.start()
+            self.tracemalloc = True
+
+    def peakrss(self):
+        """ peakrss()
+
+        return the peak resident set size of the process in bytes
+        """
+        if resource is None:
+            return None
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            return rss
+        return rss * 1024
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """ stage(name)
+
+        context manager that records one stage
+        the dict it yields takes rowsin, rowsout and bytes counts
+        name - name of the stage
+        """
+        st = {'stage': name, 'rowsin': None, 'rowsout': None, 'bytes': None}
+        if not self.enabled:
+            yield st
+            return
+        if self.tracemalloc:
+            import tracemalloc as tm
+            if hasattr(tm, 'reset_peak'):     # python 3.9
+                tm.reset_peak()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield st
+        finally:
+            st['wall'] = time.perf_counter() - wall
+            st['cpu'] = time.process_time() - cpu
+            st['peakrss'] = self.peakrss()
+            if self.tracemalloc:
+                import tracemalloc as tm
+                st['heappeak'] = tm.get_traced_memory()[1]
+            self.stages.append(st)
+
+    def report(self, fp, fmt='table'):
+        """ report(fp, fmt)
+
+        write the recorded stages
+        fp  - file to write
+        fmt - table for a summary table, json for one json line per
+              stage
+        """
+        if fmt == 'json':
+            for st in self.stages:
+                print(json.dumps(st), file=fp)
+            return
+        cols = ['stage', 'wall', 'cpu', 'rowsin', 'rowsout', 'bytes',
+                'peakrss']
+        if self.tracemalloc:
+            cols.append('heappeak')
+        fmts = ' '.join(['%-28s'] + ['%12s' for c in cols[1:]])
+        print(fmts % tuple(cols), file=fp)
+        for st in self.stages:
+            vals = [st['stage']]
+            for c in cols[1:]:
+                v = st.get(c)
+                if v is None:
+                    vals.append('-')
+                elif isinstance(v, float):
+                    vals.append('%.3f' % (v))
+                else:
+                    vals.append(str(v))
+            print(fmts % tuple(vals), file=fp)
+
+    def dumpcprofile(self, file):
+        """ dumpcprofile(file)
+
+        stop the cProfile profiler and save its statistics
+        file - pstats file to write
+        """
+        if self.cprofile is None:
+            return
+        self.cprofile.disable()
+        self.cprofile.dump_stats(file)
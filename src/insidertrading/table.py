@@ -0,0 +1,132 @@
+
+import array
+
+class Form345Table():
+
+    def __init__(self, cols, cats=(), nums=()):
+        """ Form345Table(cols, cats, nums)
+
+        column store for rows parsed from a form345 member file
+        each column is one list, or one array of doubles, so a row
+        costs no dict and no copies of the header strings
+        cols - column names
+        cats - categorical columns whose values are shared
+        nums - numeric columns stored as doubles
+        """
+        self.cols = list(cols)
+        self.cidx = {}
+        for i in range(len(self.cols)):
+            self.cidx[self.cols[i]] = i
+        self.cats = tuple(cats)
+        self.nums = tuple(nums)
+        self.vecs = []
+        for c in self.cols:
+            if c in self.nums:
+                self.vecs.append(array.array('d') )
+            else:
+                self.vecs.append([])
+        # one value object per distinct categorical value
+        self.catvals = {}
+        for c in self.cats:
+            if c in self.cidx:
+                self.catvals[self.cidx[c]] = {}
+        # (vector, shared values or None) per column for append
+        self.appenders = [(self.vecs[i], self.catvals.get(i))
+                          for i in range(len(self.vecs))]
+        self.nrows = 0
+
+    def __len__(self):
+        return self.nrows
+
+    def append(self, row):
+        """ append(row)
+
+        append one row
+        row - sequence of values in cols order
+        """
+        for (vec, cv), v in zip(self.appenders, row):
+            if cv is not None:
+                v = cv.setdefault(v, v)
+            vec.append(v)
+        self.nrows = self.nrows + 1
+
+    def extend(self, other):
+        """ extend(other)
+
+        append the rows of a table with the same columns
+        other - Form345Table
+        """
+        if other.cols != self.cols:
+            raise ValueError('extend: columns differ')
+        for i in range(len(self.vecs)):
+            if i in self.catvals:
+                cv = self.catvals[i]
+                self.vecs[i].extend([cv.setdefault(v, v) for v in other.vecs[i]])
+            else:
+                self.vecs[i].extend(other.vecs[i])
+        self.nrows = self.nrows + other.nrows
+
+    def column(self, col):
+        """ column(col)
+
+        return the values of a column
+        col - column name
+        """
+        return self.vecs[self.cidx[col]]
+
+    def row(self, r):
+        """ row(r)
+
+        return row r as a tuple
+        """
+        return tuple([vec[r] for vec in self.vecs])
+
+    def rows(self):
+        """ rows()
+
+        iterate over the rows as tuples
+        """
+        return zip(*self.vecs)
+
+    def select(self, rs):
+        """ select(rs)
+
+        return a new table holding rows rs in that order
+        rs - row numbers
+        """
+        tbl = Form345Table(self.cols, self.cats, self.nums)
+        for r in rs:
+            tbl.append(self.row(r) )
+        return tbl
+
+    def state(self):
+        """ state()
+
+        return the table as a dict of json types, see fromstate
+        """
+        return {'cols': self.cols, 'cats': list(self.cats),
+                'nums': list(self.nums),
+                'vecs': [list(vec) for vec in self.vecs]}
+
+def fromstate(st):
+    """ fromstate(st)
+
+    return the Form345Table saved by Form345Table.state
+    st - dict from state
+    """
+    tbl = Form345Table(st['cols'], st['cats'], st['nums'])
+    if len(st['vecs']) != len(tbl.cols):
+        raise ValueError('fromstate: columns differ')
+    nrows = None
+    for i in range(len(tbl.cols)):
+        vals = st['vecs'][i]
+        if nrows is None:
+            nrows = len(vals)
+        if len(vals) != nrows:
+            raise ValueError('fromstate: column lengths differ')
+        if i in tbl.catvals:
+            cv = tbl.catvals[i]
+            vals = [cv.setdefault(v, v) for v in vals]
+        tbl.vecs[i].extend(vals)
+    tbl.nrows = nrows or 0
+    return tbl
@@ -0,0 +1,3 @@
+# SPDX-FileCopyrightText: 2024-present Don Caldwell <dfwcnj@gmail.com>
+#
+# SPDX-License-Identifier: MIT
@@ -0,0 +1,76 @@
+# SPDX-FileCopyrightText: 2024-present Don Caldwell <dfwcnj@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import pytest
+
+from insidertrading.db import InsiderDB
+
+
+def trades(n, cik=1000, date='2025-01-06', owners=(1, 2, 3)):
+    """ trades(n, cik, date, owners)
+
+    return (transactions, submissions, owners) rows for n purchases of
+    1..n dollars, one filing per trade, owners taking turns
+    """
+    trs, subs, owns = [], [], []
+    for i in range(n):
+        an = '%010d-25-%06d' % (cik, i)
+        own = owners[i % len(owners)]
+        trs.append( (an, 1, 'Common', date, 'P', float(i + 1), 1.0,
+                     float(i + 1)) )
+        subs.append( (an, date, '4', cik, 'ISSUER %d' % (cik),
+                      'T%d' % (cik)) )
+        owns.append( (an, own, 'OWNER %d' % (own)) )
+    return trs, subs, owns
+
+
+def load(sdb, trs, subs, owns):
+    """ load(sdb, trs, subs, owns)
+
+    load rows made by trades into an InsiderDB and update its stats
+    """
+    sdb.insertmany('transactions', ['ACCESSION_NUMBER', 'NONDERIV_TRANS_SK',
+        'SECURITY_TITLE', 'TRANS_DATE', 'TRANS_CODE', 'TRANS_SHARES',
+        'TRANS_PRICEPERSHARE', 'TRANSDOLLARS'], trs)
+    sdb.insertmany('submissions', ['ACCESSION_NUMBER', 'FILING_DATE',
+        'DOCUMENT_TYPE', 'ISSUERCIK', 'ISSUERNAME', 'ISSUERTRADINGSYMBOL'],
+        subs)
+    sdb.insertmany('owners', ['ACCESSION_NUMBER', 'RPTOWNERCIK',
+        'RPTOWNERNAME'], owns)
+    sdb.newinsiderindex()
+    sdb.updatestats()
+
+
+@pytest.fixture
+def insiderdb(tmp_path):
+    """ an insider database file holding 100 trades of one issuer """
+    sdb = InsiderDB()
+    sdb.dbconnect(str(tmp_path / 'insiders.db') )
+    sdb.newinsidertable(index=False)
+    load(sdb, *trades(100) )
+    yield sdb
+    sdb.dbcon.close()
+
+
+# form345 member headers, enough columns for the parsers and the load
+TRHDR = ['ACCESSION_NUMBER', 'NONDERIV_TRANS_SK', 'SECURITY_TITLE',
+         'TRANS_DATE', 'TRANS_CODE', 'TRANS_SHARES', 'TRANS_PRICEPERSHARE']
+SUBHDR = ['ACCESSION_NUMBER', 'FILING_DATE', 'PERIOD_OF_REPORT',
+          'DOCUMENT_TYPE', 'ISSUERCIK', 'ISSUERNAME', 'ISSUERTRADINGSYMBOL']
+OWNHDR = ['ACCESSION_NUMBER', 'RPTOWNERCIK', 'RPTOWNERNAME']
+
+
+def form345zip(path, trs, subs, owns):
+    """ form345zip(path, trs, subs, owns)
+
+    write a form345 zip file with rows for TRHDR, SUBHDR and OWNHDR,
+    dates in the DD-MON-YYYY form of the sec.gov files
+    """
+    import zipfile
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zfp:
+        for file, hdr, rows in [('NONDERIV_TRANS.tsv', TRHDR, trs),
+                                ('SUBMISSION.tsv', SUBHDR, subs),
+                                ('REPORTINGOWNER.tsv', OWNHDR, owns)]:
+            lines = ['\t'.join(hdr)]
+            lines.extend(['\t'.join([str(v) for v in row]) for row in rows])
+            zfp.writestr(file, '\n'.join(lines) + '\n')
@@ -0,0 +1,33 @@
+# SPDX-FileCopyrightText: 2024-present Don Caldwell <dfwcnj@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import csv
+import io
+import subprocess
+import sys
+
+
+def run(*args):
+    cp = subprocess.run([sys.executable, '-m', 'insidertrading.insidertrading']
+                        + list(args), capture_output=True, text=True)
+    return cp.returncode, list(csv.reader(io.StringIO(cp.stdout) )), cp.stderr
+
+
+def test_query_dates(insiderdb):
+    # the fixture trades are all on 2025-01-06
+    for args in [['--sdate', '2025-03-01', 'query', 'top'],
+                 ['query', 'top', '--sdate', '2025-03-01']]:
+        rc, rows, err = run(*args, '--insiderdb', insiderdb.dbfile)
+        assert rc == 0, err
+        assert len(rows) == 1
+    rc, rows, err = run('--edate', '2025-01-06', '--columns', 'TRANSDOLLARS',
+                        'query', 'top', '--insiderdb', insiderdb.dbfile,
+                        '--limit', '3')
+    assert rows == [['TRANSDOLLARS'], ['100.0'], ['99.0'], ['98.0']]
+
+
+def test_query_error(insiderdb):
+    rc, rows, err = run('query', 'top', '--insiderdb', insiderdb.dbfile,
+                        '--columns', 'NOSUCH')
+    assert rc == 1
+    assert err.startswith('query: ')
@@ -0,0 +1,46 @@
+# SPDX-FileCopyrightText: 2024-present Don Caldwell <dfwcnj@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import pytest
+
+from insidertrading.insidertrading import EDGARInsiderTrading
+
+MONTHS = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN',
+          'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+
+
+@pytest.mark.parametrize('n,mon', list(enumerate(MONTHS, 1)))
+def test_every_month(n, mon):
+    eit = EDGARInsiderTrading()
+    assert eit.secdate2iso('15-%s-2024' % (mon)) == '2024-%02d-15' % (n)
+    assert eit.secdate2iso('15-%s-2024' % (mon.lower())) == \
+        '2024-%02d-15' % (n)
+    assert eit.secdate2iso('15-%d-2024' % (n)) == '2024-%02d-15' % (n)
+
+
+@pytest.mark.parametrize('sd,iso', [
+    ('6-JAN-2025', '2025-01-06'),
+    ('06-JAN-2025', '2025-01-06'),
+    ('6-1-2025', '2025-01-06'),
+    ('06-01-2025', '2025-01-06'),
+    ('31-DEC-1999', '1999-12-31'),
+])
+def test_single_digit_day(sd, iso):
+    assert EDGARInsiderTrading().secdate2iso(sd) == iso
+
+
+@pytest.mark.parametrize('sd', [
+    '', '2025-01-06', 'foo', 'XX-FOO-2025', '1-2-3', '31-DEC-99',
+    '06-JAN-2025-1', '06JAN2025', '123-JAN-2025', '06-JANU-2025',
+    '٣-01-2025', '06-01-٢٠٢٥',
+])
+def test_malformed_unchanged(sd):
+    assert EDGARInsiderTrading().secdate2iso(sd) == sd
+
+
+def test_memo_bounded():
+    eit = EDGARInsiderTrading()
+    eit.isodatemax = 4
+    for d in range(1, 10):
+        assert eit.secdate2iso('%d-MAR-2025' % (d)) == '2025-03-%02d' % (d)
+    assert len(eit.isodates) <= eit.isodatemax
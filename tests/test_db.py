@@ -0,0 +1,84 @@
+# SPDX-FileCopyrightText: 2024-present Don Caldwell <dfwcnj@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import sqlite3
+
+import pytest
+
+from insidertrading.db import InsiderDB
+
+
+def v0db(path, dates):
+    """ v0db(path, dates)
+
+    write a version 0 database with one insiders row per TRANS_DATE
+    """
+    sdb = InsiderDB()
+    con = sqlite3.connect(path)
+    con.execute('CREATE TABLE insiders (%s)' % (
+                ', '.join(["'%s'" % (c) for c in sdb.icols]) ) )
+    for i in range(len(dates)):
+        row = dict.fromkeys(sdb.icols, '')
+        row.update({'ACCESSION_NUMBER': 'A%d' % (i),
+                    'NONDERIV_TRANS_SK': str(i), 'TRANS_DATE': dates[i],
+                    'FILING_DATE': dates[i], 'TRANSDOLLARS': '1000.0',
+                    'ISSUERCIK': '1000', 'RPTOWNERCIK': '1'})
+        con.execute('INSERT INTO insiders VALUES (%s)' % (
+                    ', '.join(['?'] * len(sdb.icols)) ),
+                    [row[c] for c in sdb.icols])
+    con.commit()
+    con.close()
+
+
+def test_migrate_v0(tmp_path):
+    path = str(tmp_path / 'v0.db')
+    # the version 0 parser left the month unpadded
+    v0db(path, ['2025216', '2025106', '20251105', ''])
+    sdb = InsiderDB()
+    sdb.dbconnect(path)
+    sdb.newinsidertable()
+    assert sdb.userversion() == sdb.schemaversion
+    rows = sdb.dbcur.execute('SELECT TRANS_DATE, FILING_DATE, NONDERIV_TRANS_SK, TRANSDOLLARS FROM insiders ORDER BY NONDERIV_TRANS_SK').fetchall()
+    assert rows == [('2025-02-16', '2025-02-16', 0, 1000.0),
+                    ('2025-01-06', '2025-01-06', 1, 1000.0),
+                    ('2025-11-05', '2025-11-05', 2, 1000.0),
+                    ('', '', 3, 1000.0)]
+
+
+def test_migrate_v0_baddate(tmp_path):
+    path = str(tmp_path / 'v0.db')
+    v0db(path, ['2025216', '25-1-2025'])
+    sdb = InsiderDB()
+    sdb.dbconnect(path)
+    with pytest.raises(ValueError, match='25-1-2025'):
+        sdb.newinsidertable()
+    # the version 0 table is left as it was
+    assert sdb.userversion() == 0
+    res = sdb.dbcur.execute("SELECT type FROM sqlite_master WHERE name='insiders'")
+    assert res.fetchone() == ('table',)
+    assert sdb.dbcur.execute('SELECT COUNT(*) FROM insiders').fetchone() == (2,)
+
+
+def test_percentiles(insiderdb):
+    # 100 trades of 1..100 dollars, nearest rank percentiles
+    res = insiderdb.dbcur.execute('SELECT TRADES, DOLLARS, P50, P75, P90, P95, P99 FROM issuerstats WHERE ISSUERCIK = 1000')
+    assert res.fetchone() == (100, 5050.0, 50.0, 75.0, 90.0, 95.0, 99.0)
+    cur = insiderdb.dollarscreen(percentile=90, mintrades=20,
+                                 cols=['TRANSDOLLARS'])
+    assert [row[0] for row in cur.fetchall()] == [float(d) for d in
+                                                  range(100, 90, -1)]
+    # too few trades for a percentile
+    cur = insiderdb.dollarscreen(percentile=90, mintrades=101)
+    assert cur.fetchall() == []
+
+
+def test_clusters(insiderdb):
+    # the fixture has three owners buying on one day
+    cur = insiderdb.clusterscreen(days=5, owners=3)
+    cols = [column[0] for column in cur.description]
+    rows = [dict(zip(cols, row)) for row in cur.fetchall()]
+    assert len(rows) == 1
+    assert (rows[0]['ISSUERCIK'], rows[0]['SDATE'], rows[0]['EDATE'],
+            rows[0]['OWNERS'], rows[0]['TRADES'], rows[0]['DOLLARS']) == \
+           (1000, '2025-01-06', '2025-01-06', 3, 100, 5050.0)
+    assert insiderdb.clusterscreen(days=5, owners=4).fetchall() == []
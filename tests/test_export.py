@@ -0,0 +1,57 @@
+# SPDX-FileCopyrightText: 2024-present Don Caldwell <dfwcnj@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import io
+
+import pytest
+
+from insidertrading.export import InsiderExport
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def readback(fmt, buf):
+    buf.seek(0)
+    if fmt == 'parquet':
+        return pq.read_table(buf)
+    return pa.ipc.open_file(buf).read_all()
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+@pytest.mark.parametrize('query,types', [
+    ('issuertotals', {'ISSUERCIK': 'int64', 'ISSUERNAME': 'string',
+                      'TRADES': 'int64', 'FILINGS': 'int64',
+                      'DOLLARS': 'double', 'LARGEST': 'double'}),
+    ('daytotals', {'TRANS_DATE': 'date32[day]', 'TRADES': 'int64',
+                   'DOLLARS': 'double', 'LARGEST': 'double'}),
+    ('clusterscreen', {'SDATE': 'date32[day]', 'EDATE': 'date32[day]',
+                       'OWNERS': 'int64', 'TRADES': 'int64',
+                       'DOLLARS': 'double'}),
+])
+def test_aggregate_types(insiderdb, fmt, query, types):
+    cur = getattr(insiderdb, query)()
+    buf = io.BytesIO()
+    nrows = InsiderExport().exportarrow(cur, buf, fmt)
+    tbl = readback(fmt, buf)
+    assert nrows == tbl.num_rows == 1
+    for c in types:
+        assert str(tbl.schema.field(c).type) == types[c]
+
+
+def test_unknown_types(insiderdb):
+    cur = insiderdb.dbcon.cursor().execute(
+        'SELECT 1 AS N, 2.5 AS X, NULL AS E, ISSUERNAME FROM issuerstats')
+    buf = io.BytesIO()
+    InsiderExport().exportarrow(cur, buf, 'arrow')
+    tbl = readback('arrow', buf)
+    assert [str(t) for t in tbl.schema.types] == ['int64', 'double',
+                                                  'string', 'string']
+    assert tbl.column('X').to_pylist() == [2.5]
+
+
+def test_empty_result(insiderdb):
+    cur = insiderdb.issuertotals(sdate='2030-01-01')
+    buf = io.BytesIO()
+    assert InsiderExport().exportarrow(cur, buf, 'parquet') == 0
+    assert str(readback('parquet', buf).schema.field('DOLLARS').type) == 'double'
@@ -0,0 +1,217 @@
+# SPDX-FileCopyrightText: 2024-present Don Caldwell <dfwcnj@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import io
+import os
+import threading
+import http.server
+import urllib.error
+import zipfile
+
+import pytest
+
+from insidertrading.fetch import EDGARFetch
+from insidertrading.insidertrading import EDGARInsiderTrading
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """ routes of the test server, counts on self.server """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.connections = self.server.connections + 1
+
+    def send(self, status, body=b'', headers=()):
+        self.send_response(status)
+        for k, v in headers:
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(body)) )
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        srv = self.server
+        srv.requests.append( (self.path, dict(self.headers)) )
+        if self.path == '/ok':
+            self.send(200, b'hello')
+        elif self.path == '/flaky':
+            srv.fails = srv.fails - 1
+            if srv.fails >= 0:
+                self.send(503, b'busy', [('Retry-After', '0')])
+            else:
+                self.send(200, b'done')
+        elif self.path == '/moved':
+            self.send(301, headers=[('Location', '/ok')])
+        elif self.path == '/loop':
+            self.send(302, headers=[('Location', '/loop')])
+        elif self.path == '/nowhere':
+            self.send(302)
+        elif self.path.startswith('/files/'):
+            self.sendfile(srv.blob)
+        else:
+            self.send(404, b'no such file')
+
+    def sendfile(self, blob):
+        """ serve blob with Range support, the first response is cut off
+        half way """
+        srv = self.server
+        if self.headers.get('If-None-Match') == srv.etag:
+            self.send(304)
+            return
+        start = 0
+        rng = self.headers.get('Range')
+        if self.headers.get('If-Range', srv.etag) != srv.etag:
+            rng = None
+        if rng:
+            start = int(rng.split('=')[1].rstrip('-'))
+            if start >= len(blob):
+                self.send(416)
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %d-%d/%d' %
+                             (start, len(blob) - 1, len(blob)) )
+        else:
+            self.send_response(200)
+        self.send_header('ETag', srv.etag)
+        self.send_header('Content-Length', str(len(blob) - start) )
+        self.end_headers()
+        if srv.cut:
+            srv.cut = False
+            self.wfile.write(blob[start:start + (len(blob) - start) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(blob[start:])
+
+
+@pytest.fixture
+def server():
+    srv = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    srv.daemon_threads = True
+    srv.connections = 0
+    srv.requests = []
+    srv.fails = 0
+    srv.cut = False
+    srv.blob = b''
+    srv.etag = '"v1"'
+    srv.url = 'http://127.0.0.1:%d' % (srv.server_address[1])
+    th = threading.Thread(target=srv.serve_forever, args=(0.05,),
+                          daemon=True)
+    th.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def fetch():
+    fe = EDGARFetch({'User-Agent': 'test test@example.com'}, ratelimit=1000)
+    fe.pause = 0
+    yield fe
+    fe.close()
+
+
+def test_keepalive(server, fetch):
+    for i in range(3):
+        fr = fetch.fetch(server.url + '/ok')
+        assert (fr.status, fr.body) == (200, b'hello')
+    assert server.connections == 1
+    assert server.requests[0][1]['User-Agent'] == 'test test@example.com'
+
+
+def test_retry(server, fetch):
+    server.fails = 2
+    fr = fetch.fetch(server.url + '/flaky')
+    assert (fr.status, fr.body) == (200, b'done')
+    assert len(server.requests) == 3
+
+
+def test_retry_exhausted(server, fetch):
+    server.fails = 10
+    fetch.retries = 3
+    with pytest.raises(urllib.error.HTTPError) as ei:
+        fetch.fetch(server.url + '/flaky')
+    assert ei.value.code == 503
+    assert len(server.requests) == 3
+
+
+def test_notfound(server, fetch):
+    with pytest.raises(urllib.error.HTTPError) as ei:
+        fetch.fetch(server.url + '/missing')
+    assert ei.value.code == 404
+    # a 4xx is not retried
+    assert len(server.requests) == 1
+
+
+def test_redirect(server, fetch):
+    fr = fetch.fetch(server.url + '/moved')
+    assert (fr.status, fr.body) == (200, b'hello')
+    for path in ['/loop', '/nowhere']:
+        with pytest.raises(urllib.error.HTTPError) as ei:
+            fetch.fetch(server.url + path)
+        assert ei.value.code == 302
+
+
+def test_resume(server, tmp_path):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as zfp:
+        zfp.writestr('NONDERIV_TRANS.tsv', os.urandom(200000) )
+    server.blob = buf.getvalue()
+    server.cut = True
+    EIT = EDGARInsiderTrading('test test@example.com')
+    EIT.iturl = server.url + '/files'
+    EIT.pause = 0
+    try:
+        EIT.getform345('2025q1_form345.zip', str(tmp_path) )
+    finally:
+        EIT.close()
+    with open(str(tmp_path / '2025q1_form345.zip'), 'rb') as fp:
+        assert fp.read() == server.blob
+    assert not os.path.exists(str(tmp_path / '2025q1_form345.zip.part') )
+    paths = [(p, h.get('Range')) for p, h in server.requests]
+    assert paths == [('/files/2025q1_form345.zip', None),
+                     ('/files/2025q1_form345.zip',
+                      'bytes=%d-' % (len(server.blob) // 2) )]
+    assert server.requests[1][1]['If-Range'] == '"v1"'
+
+
+def test_refresh_interrupted(server, tmp_path):
+    def archive(v):
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w') as zfp:
+            zfp.writestr('NONDERIV_TRANS.tsv', v + os.urandom(100000) )
+        return buf.getvalue()
+
+    file = '2025q1_form345.zip'
+    ofn = str(tmp_path / file)
+    EIT = EDGARInsiderTrading('test test@example.com')
+    EIT.iturl = server.url + '/files'
+    EIT.pause = 0
+    try:
+        server.blob = v1 = archive(b'v1')
+        EIT.getform345(file, str(tmp_path) )
+        # the refresh is cut off and the process stops
+        server.blob = v2 = archive(b'v2')
+        server.etag = '"v2"'
+        server.cut = True
+        EIT.refresh = True
+        assert not EIT.fetcher().run(EIT.agetform345part(file, ofn) )
+        with open(ofn, 'rb') as fp:
+            assert fp.read() == v1
+        assert EIT.readmeta(ofn + '.meta')['etag'] == '"v1"'
+        # the next refresh resumes the new archive
+        EIT.getform345(file, str(tmp_path) )
+        with open(ofn, 'rb') as fp:
+            assert fp.read() == v2
+        assert EIT.readmeta(ofn + '.meta')['etag'] == '"v2"'
+        assert sorted(os.listdir(str(tmp_path) )) == [file, file + '.meta']
+        # and a refresh after that is not modified
+        EIT.getform345(file, str(tmp_path) )
+    finally:
+        EIT.close()
+    assert server.requests[-2][1]['Range'] == 'bytes=%d-' % (len(v2) // 2)
+    assert server.requests[-1][1]['If-None-Match'] == '"v2"'
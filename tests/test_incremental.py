@@ -0,0 +1,65 @@
+# SPDX-FileCopyrightText: 2024-present Don Caldwell <dfwcnj@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import os
+
+from insidertrading.insidertrading import EDGARInsiderTrading
+
+from .conftest import form345zip
+
+
+def filings(prices):
+    """ filings(prices)
+
+    return form345 rows with one filing, trade and owner per
+    ACCESSION_NUMBER in prices
+    """
+    trs, subs, owns = [], [], []
+    for an in sorted(prices):
+        trs.append( (an, 1, 'Common Stock', '06-JAN-2025', 'P', 100,
+                     prices[an]) )
+        subs.append( (an, '07-JAN-2025', '06-JAN-2025', '4', 1000,
+                      'ISSUER', 'ISS') )
+        owns.append( (an, 1, 'OWNER') )
+    return trs, subs, owns
+
+
+def load(insiderdb, fzpath):
+    EIT = EDGARInsiderTrading('test test@example.com')
+    try:
+        nrows = EIT.processincremental(insiderdb, fzpath)
+        res = EIT.sdb.dbcur.execute('SELECT ACCESSION_NUMBER, TRANS_PRICEPERSHARE FROM transactions ORDER BY ACCESSION_NUMBER')
+        rows = res.fetchall()
+        nfilings = EIT.sdb.dbcur.execute('SELECT COUNT(*) FROM filings').fetchone()[0]
+    finally:
+        EIT.close()
+    return nrows, rows, nfilings
+
+
+def test_incremental(tmp_path):
+    insiderdb = str(tmp_path / 'insiders.db')
+    fzpath = str(tmp_path / '2025q1_form345.zip')
+    prices = {'A0': 10.0, 'A1': 11.0, 'A2': 12.0, 'A3': 13.0, 'A4': 14.0}
+    form345zip(fzpath, *filings(prices) )
+    nrows, rows, nfilings = load(insiderdb, fzpath)
+    assert nrows == 5
+    assert rows == sorted(prices.items() )
+    assert nfilings == 5
+
+    # A0 is amended, A4 withdrawn and A5 new
+    prices['A0'] = 20.0
+    del prices['A4']
+    prices['A5'] = 15.0
+    form345zip(fzpath, *filings(prices) )
+    os.utime(fzpath, ns=(1, 1) )
+    nrows, rows, nfilings = load(insiderdb, fzpath)
+    assert nrows == 2
+    assert rows == sorted(prices.items() )
+    assert nfilings == 5
+
+    # unchanged, then the same bytes with a new mtime
+    assert load(insiderdb, fzpath)[0] == 0
+    os.utime(fzpath, ns=(2, 2) )
+    nrows, rows, nfilings = load(insiderdb, fzpath)
+    assert nrows == 0
+    assert rows == sorted(prices.items() )
@@ -0,0 +1,63 @@
+# SPDX-FileCopyrightText: 2024-present Don Caldwell <dfwcnj@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import os
+
+import pytest
+
+from insidertrading.insidertrading import EDGARInsiderTrading, \
+    InsiderTradingError
+
+PAGE = os.path.join(os.path.dirname(__file__), 'data',
+                    'insider-transactions-data-sets.html')
+BASE = ('https://www.sec.gov/files/structureddata/data/'
+        'insider-transactions-data-sets/')
+
+
+@pytest.fixture
+def html():
+    with open(PAGE) as fp:
+        return fp.read()
+
+
+def test_form345links(html):
+    links = EDGARInsiderTrading().form345links(html)
+    assert links == [
+        {'name': '2025q2_form345.zip', 'yq': '2025Q2',
+         'url': BASE + '2025q2_form345.zip', 'size': '12.41 MB'},
+        {'name': '2025q1_form345.zip', 'yq': '2025Q1',
+         'url': BASE + '2025q1_form345.zip', 'size': '13.9 MB'},
+        {'name': '2024q4_form345.zip', 'yq': '2024Q4',
+         'url': BASE + '2024q4_form345.zip', 'size': '11.62 MB'},
+        {'name': '2006q1_form345.zip', 'yq': '2006Q1',
+         'url': BASE + '2006q1_form345.zip', 'size': None},
+    ]
+
+
+def test_latestform345name(html):
+    eit = EDGARInsiderTrading()
+    assert eit.latestform345name(html) == BASE + '2025q2_form345.zip'
+    assert eit.latestform345name('<p>no archives</p>') is None
+
+
+def test_form345range():
+    eit = EDGARInsiderTrading()
+    assert eit.form345range('2024q3:2025Q2') == \
+        ['2024Q3', '2024Q4', '2025Q1', '2025Q2']
+    assert eit.form345range('2025Q1:2025Q1') == ['2025Q1']
+
+
+@pytest.mark.parametrize('yqrange', [
+    '2025Q2:2025Q1', '2025Q1:2024Q4', '2025Q5:2025Q6', '2025Q1', 'foo:bar',
+])
+def test_form345range_bad(yqrange):
+    with pytest.raises(InsiderTradingError):
+        EDGARInsiderTrading().form345range(yqrange)
+
+
+def test_processrange_reversed(tmp_path):
+    dbfile = str(tmp_path / 'insiders.db')
+    with pytest.raises(InsiderTradingError, match='after'):
+        EDGARInsiderTrading().processrange(dbfile, '2025Q2:2025Q1',
+                                           str(tmp_path))
+    assert not os.path.exists(dbfile)
@@ -0,0 +1,48 @@
+# SPDX-FileCopyrightText: 2024-present Don Caldwell <dfwcnj@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import sqlite3
+
+import pytest
+
+from insidertrading.insidertrading import EDGARInsiderTrading
+
+from .conftest import form345zip
+
+
+def quarter(path, an, price):
+    form345zip(path, [(an, 1, 'Common Stock', '06-JAN-2025', 'P', 100,
+                       price)],
+               [(an, '07-JAN-2025', '06-JAN-2025', '4', 1000, 'ISSUER',
+                 'ISS')],
+               [(an, 1, 'OWNER')])
+
+
+def accessions(dbfile):
+    con = sqlite3.connect(dbfile)
+    try:
+        res = con.execute('SELECT ACCESSION_NUMBER FROM transactions')
+        return [row[0] for row in res.fetchall()]
+    finally:
+        con.close()
+
+
+def test_loadquarter_databases(tmp_path):
+    quarter(str(tmp_path / '2025q1_form345.zip'), 'A1', 10.0)
+    quarter(str(tmp_path / '2025q2_form345.zip'), 'A2', 20.0)
+    adb, bdb = str(tmp_path / 'a.db'), str(tmp_path / 'b.db')
+    EIT = EDGARInsiderTrading('test test@example.com')
+    try:
+        assert EIT.loadquarter(adb, '2025Q1', str(tmp_path) ) == 1
+        acon = EIT.sdb.dbcon
+        assert EIT.loadquarter(bdb, '2025Q2', str(tmp_path) ) == 1
+        assert EIT.sdb.dbcon is not acon
+        # the connection to a.db was closed
+        with pytest.raises(sqlite3.ProgrammingError):
+            acon.execute('SELECT 1')
+        EIT.incremental = True
+        assert EIT.loadquarter(adb, '2025Q2', str(tmp_path) ) == 1
+    finally:
+        EIT.close()
+    assert sorted(accessions(adb) ) == ['A1', 'A2']
+    assert accessions(bdb) == ['A2']
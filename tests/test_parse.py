@@ -0,0 +1,50 @@
+# SPDX-FileCopyrightText: 2024-present Don Caldwell <dfwcnj@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import pytest
+
+from insidertrading.insidertrading import EDGARInsiderTrading
+
+from .conftest import form345zip
+
+
+def quarter(path, n):
+    """ quarter(path, n)
+
+    write a form345 zip file of n filings, every third without an owner
+    """
+    trs, subs, owns = [], [], []
+    for i in range(n):
+        an = '0001000000-25-%06d' % (i)
+        trs.append( (an, 1, 'Common Stock', '%02d-JAN-2025' % (i % 28 + 1),
+                     'P', i + 1, 2.5) )
+        subs.append( (an, '30-JAN-2025', '31-JAN-2025', '4', 1000 + i % 7,
+                      'ISSUER', 'ISS') )
+        if i % 3:
+            owns.append( (an, i % 11, 'OWNER') )
+    form345zip(path, trs, subs, owns)
+
+
+def parse(fzpath, jobs, top=None):
+    EIT = EDGARInsiderTrading('test test@example.com')
+    EIT.jobs = jobs
+    EIT.top = top
+    # blocks of a few hundred rows
+    EIT.blockmin = 8192
+    EIT.stats.enable()
+    EIT.parse345forms(fzpath)
+    tbls = [list(tbl.rows()) for tbl in [EIT.transactions, EIT.submissions,
+                                         EIT.owner]]
+    return tbls, EIT.rowsin
+
+
+@pytest.mark.parametrize('n,top', [(2000, None), (2000, 10), (0, None)])
+def test_parallel(tmp_path, n, top):
+    fzpath = str(tmp_path / '2025q1_form345.zip')
+    quarter(fzpath, n)
+    serial, rowsin = parse(fzpath, 1, top)
+    parallel, prowsin = parse(fzpath, 3, top)
+    assert len(serial[0]) == min(n, top or n)
+    assert parallel == serial
+    # every row of the three members
+    assert prowsin == n + n + len([i for i in range(n) if i % 3])